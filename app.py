@@ -1,9 +1,13 @@
-from flask import Flask
+from services.startup import mark_phase, start_background_warmup, startup_status, startup_report
+from services.log_maintenance import start_maintenance_thread
+from flask import Flask, jsonify
 from flask_cors import CORS
 from routes.webhook import webhook_bp
 from routes.web_chat import web_chat_bp
-from config import FLASK_HOST, FLASK_PORT, MODEL_NAME
-import ollama
+from services.sharding import is_router
+from config import FLASK_HOST, FLASK_PORT, SHARD_COUNTRY
+
+mark_phase("imports")
 
 app = Flask(__name__)
 CORS(app)
@@ -12,18 +16,30 @@ CORS(app)
 app.register_blueprint(webhook_bp, url_prefix="/webhook")
 app.register_blueprint(web_chat_bp, url_prefix="/chat")
 
-# Precargar modelo Ollama al levantar el servidor
-def precargar_modelo():
-    try:
-        print(f"Precargando modelo Ollama: {MODEL_NAME}")
-        ollama.chat(model=MODEL_NAME, messages=[
-            {"role": "user", "content": "Hola"}
-        ])
-        print("✅ Modelo precargado.")
-    except Exception as e:
-        print("⚠️ Error al precargar modelo Ollama:", e)
+@app.route('/health', methods=['GET'])
+def health():
+    status = startup_status()
+    return jsonify(status), (200 if status["ready"] else 503)
+
+mark_phase("app_ready")
+
+# El router es delgado: no precarga datasets (los índices viven en cada
+# shard) y queda listo apenas carga el router de intenciones. Un shard solo
+# precarga su país; en modo normal se precargan todos.
+if is_router():
+    _countries = []
+elif SHARD_COUNTRY:
+    _countries = [SHARD_COUNTRY]
+else:
+    _countries = None
 
-# Solo precarga si se ejecuta directamente
+# Solo precarga el modelo si se ejecuta directamente; los datasets se
+# cargan en segundo plano en ambos casos para no bloquear el arranque.
 if __name__ == '__main__':
-    precargar_modelo()
+    start_background_warmup(preload_model=not is_router(), countries=_countries)
+    start_maintenance_thread()
+    print(startup_report())
     app.run(host=FLASK_HOST, port=FLASK_PORT)
+else:
+    start_background_warmup(preload_model=False, countries=_countries)
+    start_maintenance_thread()
@@ -1,5 +1,6 @@
 # config.py
 
+import os
 from pathlib import Path
 
 # Configuración Flask
@@ -8,14 +9,24 @@ FLASK_PORT = 5001
 
 # Modelo Ollama
 MODEL_NAME = "mistral"
+LLM_THRESHOLD = 0.9  # Usar Mistral solo si la predicción tiene score < 0.9
+OLLAMA_URL = os.environ.get("OLLAMA_URL", "http://127.0.0.1:11434/api/chat")
 
 # Tokens Meta
 VERIFY_TOKEN = "TOKEN_SECRETO"
 PAGE_ACCESS_TOKEN = "TOKEN_PAGINA_META"
+GRAPH_API_URL = os.environ.get("GRAPH_API_URL", "https://graph.facebook.com/v19.0")
 
 # Timeout en segundos (15 min)
 INACTIVITY_TIMEOUT = 5 * 60
 
+# Mantenimiento de logs/ (services/log_maintenance.py)
+LOG_MAINTENANCE_INTERVAL = 6 * 60 * 60      # segundos entre corridas; 0 lo desactiva
+TRAINING_LOG_MAX_BYTES = 5 * 1024 * 1024    # rota training_data.jsonl al superar esto
+TRAINING_ARCHIVES_KEEP = 12                 # .jsonl.gz que se conservan
+NO_CONTEXT_KEEP_RAW = 200                   # entradas crudas recientes en no_context_log.jsonl
+LAST_PREDICTION_TTL = 24 * 60 * 60          # vigencia de last_predictions.jsonl
+
 # Carpetas de datos por país
 DATA_PATH = Path("data")
 AVAILABLE_COUNTRIES = {
@@ -24,3 +35,19 @@ AVAILABLE_COUNTRIES = {
     "PA": "pa",
     "SLV": "slv"
 }
+
+# Reglas opcionales del filtro de salida del LLM (reemplazan las de services/guard_engine.py)
+GUARD_RULES_FILE = DATA_PATH / "guard_rules.json"
+
+# Modo shards por país (opcional)
+# SHARD_COUNTRY: carpeta del país que atiende este proceso ("" = todos / router)
+# SHARD_URLS: "cr=http://127.0.0.1:5101,slv=http://127.0.0.1:5104"; si está
+# definido y SHARD_COUNTRY está vacío, este proceso actúa como router.
+SHARD_COUNTRY = os.environ.get("SHARD_COUNTRY", "").strip().lower()
+SHARD_URLS = {
+    k.strip().lower(): v.strip().rstrip("/")
+    for k, v in (par.split("=", 1) for par in os.environ.get("SHARD_URLS", "").split(",") if "=" in par)
+}
+SHARD_TIMEOUT = 40
+# Secreto compartido router <-> shards (cabecera X-Shard-Token); vacío = sin verificar
+SHARD_SECRET = os.environ.get("SHARD_SECRET", "")
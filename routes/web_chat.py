@@ -1,7 +1,10 @@
 # routes/web_chat.py
 
-from flask import Blueprint, request, jsonify
-from services.chat_service import handle_message
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+from services.sharding import (
+    dispatch_message, handle_shard_request, shard_report, collect_shard_reports,
+    accepts_shard_requests, accepts_stats_request, SHARD_TOKEN_HEADER
+)
 
 web_chat_bp = Blueprint('web_chat', __name__)
 
@@ -11,5 +14,47 @@ def web_chat():
     user_msg = data.get('message', '').lower()
     user_id = data.get('user_id', 'web-user')  # Puedes hacer esto dinámico si usas múltiples usuarios
 
-    bot_reply = handle_message(user_id, user_msg, channel='web')
+    bot_reply = dispatch_message(user_id, user_msg, channel='web')
     return jsonify({"reply": bot_reply})
+
+@web_chat_bp.route('/batch', methods=['POST'])
+def web_chat_batch():
+    """Cuerpo JSONL con {"country", "message"} por línea; responde JSONL en streaming."""
+    from services.batch_service import answer_batch_jsonl, MAX_LLM_WORKERS
+
+    use_llm = request.args.get('llm', '0') in ('1', 'true', 'si')
+    workers = min(request.args.get('workers', MAX_LLM_WORKERS, type=int), MAX_LLM_WORKERS)
+    channel = request.args.get('channel', 'web')
+
+    stream = answer_batch_jsonl(request.stream, use_llm=use_llm, max_workers=workers, channel=channel)
+    return Response(stream_with_context(stream), mimetype='application/x-ndjson')
+
+# Endpoints internos del modo shards por país
+@web_chat_bp.route('/shard', methods=['POST'])
+def shard_chat():
+    # Solo en procesos shard; el router público responde 404
+    if not accepts_shard_requests(request.headers.get(SHARD_TOKEN_HEADER)):
+        return jsonify({"error": "not found"}), 404
+    data = request.get_json(silent=True) or {}
+    try:
+        return jsonify(handle_shard_request(
+            data.get('user_id', 'web-user'),
+            data.get('message', ''),
+            data.get('channel', 'web'),
+            data.get('country')
+        ))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+# Reportes internos: exponen pid/memoria y /shards consulta a cada shard
+@web_chat_bp.route('/shard/stats', methods=['GET'])
+def shard_stats():
+    if not accepts_stats_request(request.headers.get(SHARD_TOKEN_HEADER)):
+        return jsonify({"error": "not found"}), 404
+    return jsonify(shard_report())
+
+@web_chat_bp.route('/shards', methods=['GET'])
+def shards_report():
+    if not accepts_stats_request(request.headers.get(SHARD_TOKEN_HEADER)):
+        return jsonify({"error": "not found"}), 404
+    return jsonify(collect_shard_reports())
@@ -2,8 +2,6 @@
 
 from flask import Blueprint, request
 from config import VERIFY_TOKEN
-from services.chat_service import handle_message
-from services.fb_messenger import send_fb_message
 
 webhook_bp = Blueprint('webhook', __name__)
 
@@ -15,6 +13,10 @@ def verify():
 
 @webhook_bp.route('/', methods=['POST'])
 def webhook():
+    # Import diferido: el GET de verificación no necesita cargar el servicio de chat
+    from services.sharding import dispatch_message
+    from services.fb_messenger import send_fb_message
+
     data = request.get_json()
     if data.get('object') == 'page':
         for entry in data.get('entry', []):
@@ -23,6 +25,6 @@ def webhook():
                     sender_id = messaging['sender']['id']
                     user_msg = messaging['message']['text'].lower()
 
-                    bot_reply = handle_message(sender_id, user_msg, channel='meta')
+                    bot_reply = dispatch_message(sender_id, user_msg, channel='meta')
                     send_fb_message(sender_id, bot_reply)
     return "OK", 200
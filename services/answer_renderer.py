@@ -0,0 +1,93 @@
+# services/answer_renderer.py (respuestas pre-renderizadas por FAQ y canal)
+#
+# Cada FAQ se renderiza una sola vez por versión del dataset: variantes con
+# enlaces corregidos, CTAs adjuntos y, para el canal web, enlaces enriquecidos.
+# El resultado queda en la propia FAQ (clave "_render"); como la caché de
+# datasets crea dicts nuevos al cambiar el archivo, se invalida sola.
+
+import re
+import zlib
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+_URL_RE = re.compile(r'(https?://[^\s<]+)')
+_NESTED_A_RE = re.compile(r'<a href="(<a href="[^"]+">[^<]+</a>)"[^>]*>[^<]+</a>')
+_SELF_A_RE = re.compile(r'<a href="([^"]+)"[^>]*>\1</a>')
+
+RENDER_KEY = "_render"
+CHANNEL_WEB = "web"
+
+# ------------------------
+# Utilidades HTML
+# ------------------------
+def render_acciones(acciones: List[Dict[str, str]]) -> str:
+    if not acciones:
+        return ""
+    htmls = []
+    for a in acciones:
+        label = a.get("label", "Abrir enlace")
+        url = a.get("url", "#")
+        htmls.append(f'<a href="{url}" target="_blank">{label}</a>')
+    return " • ".join(htmls)
+
+def fix_links_html(text: str) -> str:
+    text = _NESTED_A_RE.sub(r'\1', text)
+    text = _SELF_A_RE.sub(r'<a href="\1" target="_blank">Ver enlace</a>', text)
+    return text
+
+def enrich_links(text: str) -> str:
+    """Envuelve URLs en <a> salvo que ya estén en un <a>."""
+    def _repl(m):
+        url = m.group(0)
+        left = text[max(0, m.start()-3):m.start()]
+        right = text[m.end():min(len(text), m.end()+4)]
+        if left.endswith('="') or left.endswith('>') or right.startswith('</a'):
+            return url
+        return f'<a href="{url}" target="_blank">{url}</a>'
+    return _URL_RE.sub(_repl, text)
+
+# ------------------------
+# Selección de variante
+# ------------------------
+def variant_index(user_id: str, user_msg: str, n: int) -> int:
+    """Índice determinista por (usuario, mensaje) sin crear un Random nuevo."""
+    if n <= 1:
+        return 0
+    return zlib.crc32((user_id + "||" + user_msg).encode("utf-8")) % n
+
+# ------------------------
+# Pre-render por FAQ
+# ------------------------
+def prepare_faq(faq: Dict[str, Any]) -> Dict[str, List[str]]:
+    rendered = faq.get(RENDER_KEY)
+    if rendered is not None:
+        return rendered
+
+    if "respuestas" not in faq and "respuesta" in faq:
+        r = faq.get("respuesta", "")
+        faq["respuestas"] = [r] if r else []
+
+    acciones_html = render_acciones(faq.get("acciones", []))
+    html: List[str] = []
+    for variante in faq.get("respuestas", []) or [""]:
+        variante = fix_links_html(variante)
+        html.append(f"{variante}" + (f" {acciones_html}" if acciones_html else ""))
+
+    rendered = {
+        "html": html,
+        CHANNEL_WEB: [enrich_links(h) for h in html],
+    }
+    faq[RENDER_KEY] = rendered
+    return rendered
+
+def rendered_answer(faq: Dict[str, Any], user_id: str, user_msg: str,
+                    channel: Optional[str] = None) -> str:
+    """Respuesta lista para mostrar: variante elegida + CTAs (+ enlaces si es web)."""
+    rendered = prepare_faq(faq)
+    variantes = rendered[CHANNEL_WEB] if channel == CHANNEL_WEB else rendered["html"]
+    return variantes[variant_index(user_id, user_msg, len(variantes))]
+
+@lru_cache(maxsize=1024)
+def interpretation_line(canon_question: str, channel: Optional[str] = None) -> str:
+    line = f"Interpreté tu consulta como: {canon_question}.\n\n"
+    return enrich_links(line) if channel == CHANNEL_WEB else line
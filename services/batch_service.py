@@ -0,0 +1,144 @@
+# services/batch_service.py (respuestas en lote, sin sesión)
+#
+# Responde muchos pares (país, mensaje) sin tocar historial, contexto, logs
+# ni predicciones por usuario. Los mensajes se agrupan por país y se
+# deduplican por texto normalizado antes de rankear; el LLM (opcional) se
+# usa solo para los que no superan el umbral, con concurrencia acotada.
+
+import json
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from config import AVAILABLE_COUNTRIES, LLM_THRESHOLD
+from services.answer_renderer import rendered_answer, enrich_links
+from services.context_builder import build_context, rank_faqs_for_country, _normalize_text
+from services.chat_service import (
+    NO_INFO_MESSAGE, build_ollama_messages, call_ollama,
+    sanitize_model_output, response_grounded_in_context
+)
+
+BATCH_SIZE = 256
+MAX_LLM_WORKERS = 4
+BATCH_USER_ID = "batch"  # solo se usa como semilla de la variante de respuesta
+
+def resolve_country(value: Optional[str]) -> Optional[str]:
+    """Acepta código ('CR') o carpeta ('cr'); devuelve la carpeta."""
+    if not value:
+        return None
+    value = str(value).strip()
+    if value.upper() in AVAILABLE_COUNTRIES:
+        return AVAILABLE_COUNTRIES[value.upper()]
+    if value.lower() in AVAILABLE_COUNTRIES.values():
+        return value.lower()
+    return None
+
+def iter_jsonl_items(lines: Iterable[Any]) -> Iterator[Dict[str, Any]]:
+    """Parsea líneas JSONL (str o bytes); las inválidas salen como error."""
+    for n, line in enumerate(lines, start=1):
+        if isinstance(line, bytes):
+            line = line.decode("utf-8", errors="replace")
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            item = json.loads(line)
+            if not isinstance(item, dict):
+                raise ValueError("se esperaba un objeto")
+        except ValueError as e:
+            item = {"_error": f"línea {n}: {e}"}
+        item.setdefault("id", n)
+        yield item
+
+def _chunks(items: Iterable[Dict[str, Any]], size: int) -> Iterator[List[Dict[str, Any]]]:
+    chunk: List[Dict[str, Any]] = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+# ---------------------------------
+# Ranking y LLM
+# ---------------------------------
+def _rank_chunk(chunk: List[Dict[str, Any]], channel: str) -> List[Dict[str, Any]]:
+    """Rankea el bloque agrupando por país y deduplicando mensajes."""
+    resultados: List[Dict[str, Any]] = []
+    vistos: Dict[tuple, tuple] = {}
+    for item in chunk:
+        base = {"id": item.get("id"), "country": item.get("country"), "message": item.get("message")}
+        if "_error" in item:
+            resultados.append({**base, "source": "error", "error": item["_error"]})
+            continue
+        country = resolve_country(item.get("country"))
+        message = item.get("message")
+        if not country or not isinstance(message, str) or not message.strip():
+            resultados.append({**base, "source": "error", "error": "país o mensaje inválido"})
+            continue
+        message = message.lower()
+
+        key = (country, _normalize_text(message))
+        if key not in vistos:
+            ranked = rank_faqs_for_country(message, country)
+            vistos[key] = ranked[0] if ranked else (0.0, None)
+        score, faq = vistos[key]
+
+        out = {**base, "score": round(float(score), 4), "faq_id": faq.get("id") if faq else None,
+               "interpretation": faq.get("pregunta") if faq else None}
+        if faq and score >= LLM_THRESHOLD:
+            out["answer"] = rendered_answer(faq, BATCH_USER_ID, message, channel)
+            out["source"] = "dataset"
+        else:
+            out["answer"] = None
+            out["source"] = "pending"
+            out["_country"] = country
+            out["_message"] = message
+        resultados.append(out)
+    return resultados
+
+def _llm_answer(out: Dict[str, Any], channel: str) -> Dict[str, Any]:
+    country, message = out.pop("_country"), out.pop("_message")
+    # Un fallo en un item no debe abortar pool.map ni el resto del lote
+    try:
+        return _llm_answer_item(out, country, message, channel)
+    except Exception as e:
+        print(f"⚠️ Error respondiendo item {out.get('id')} del lote:", e)
+        out.update(answer=None, source="error", error=str(e))
+        return out
+
+def _llm_answer_item(out: Dict[str, Any], country: str, message: str, channel: str) -> Dict[str, Any]:
+    context = build_context(message, BATCH_USER_ID, country=country)
+    if not context.strip():
+        out.update(answer=NO_INFO_MESSAGE, source="fallback")
+        return out
+    bot_msg = call_ollama(build_ollama_messages(BATCH_USER_ID, context, [], message))
+    bot_msg, bloqueado = sanitize_model_output(bot_msg)
+    if bloqueado or not bot_msg.strip() or not response_grounded_in_context(bot_msg, context):
+        out.update(answer=NO_INFO_MESSAGE, source="fallback")
+        return out
+    if channel == 'web':
+        bot_msg = enrich_links(bot_msg)
+    out.update(answer=bot_msg, source="llm")
+    return out
+
+def answer_batch(items: Iterable[Dict[str, Any]], use_llm: bool = False,
+                 max_workers: int = MAX_LLM_WORKERS, channel: str = 'web',
+                 batch_size: int = BATCH_SIZE) -> Iterator[Dict[str, Any]]:
+    """Genera un resultado por item, en el mismo orden de entrada."""
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        for chunk in _chunks(items, batch_size):
+            resultados = _rank_chunk(chunk, channel)
+            pendientes = [r for r in resultados if r["source"] == "pending"]
+            if use_llm and pendientes:
+                list(pool.map(lambda r: _llm_answer(r, channel), pendientes))
+            else:
+                for r in pendientes:
+                    r.pop("_country", None)
+                    r.pop("_message", None)
+                    r.update(answer=NO_INFO_MESSAGE, source="fallback")
+            yield from resultados
+
+def answer_batch_jsonl(lines: Iterable[Any], **kwargs) -> Iterator[str]:
+    for result in answer_batch(iter_jsonl_items(lines), **kwargs):
+        yield json.dumps(result, ensure_ascii=False) + "\n"
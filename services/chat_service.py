@@ -1,35 +1,29 @@
 # chat_service.py (RAG estricto + interpretación + grounding + entrenamiento continuo)
 
-import requests
-import re
-import difflib
-import json
-import os
-from datetime import datetime
-from typing import Optional, Tuple, List
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
 
 from services.history_manager import (
     get_user_history, update_history, reset_user_history,
-    get_context, set_context
+    set_context, refresh_context
 )
 from services.context_builder import build_context, top_faq_answer, rank_faqs
-from utils.country_selector import get_user_country, set_user_country
-from config import MODEL_NAME
+from services.answer_renderer import enrich_links, interpretation_line
+from services.guard_engine import (
+    GUARD_ENGINE, FORBIDDEN_TERMS, BLOCKLIST_SNIPPETS  # noqa: F401 (reexport)
+)
+from services.intent_router import (
+    IntentRouter, INTENT_NEGATIVE, INTENT_COMMAND, INTENT_COUNTRY, INTENT_COURTESY
+)
+from utils.country_selector import get_user_country, set_user_country, set_user_country_folder
+from utils.jsonstream import iter_jsonl_reverse
+from utils.logfiles import append_jsonl, TRAIN_FILE, LAST_PRED_FILE, NOCTX_FILE
+from config import MODEL_NAME, OLLAMA_URL, LLM_THRESHOLD, LAST_PREDICTION_TTL
 
 # ---------------------------------
 # Configuración de umbrales y LLM
 # ---------------------------------
-LLM_THRESHOLD = 0.9  # Usar Mistral solo si la predicción tiene score < 0.9
 SHOW_INTERPRETATION = True  # Muestra la línea de interpretación basada SOLO en 'pregunta' del dataset
-OLLAMA_URL = "http://127.0.0.1:11434/api/chat"
-
-# Términos sensibles que NO deben aparecer si no están en el contexto
-FORBIDDEN_TERMS = {
-    "hipotecario", "hipoteca", "hipotecarios",
-    "automotriz", "auto", "vehicular",
-    "empresarial", "empresa", "negocio",
-    "tarjeta de crédito", "tarjeta crédito"
-}
 
 # ---------------------------------
 # Países y mensajes base (ES-CR)
@@ -45,6 +39,7 @@ COUNTRY_CODES = {
     "pa": "PA", "panama": "PA", "panamá": "PA", "🇵🇦": "PA",
     "slv": "SLV", "sv": "SLV", "el salvador": "SLV", "salvador": "SLV", "🇸🇻": "SLV"
 }
+COUNTRY_LABELS = ["costa rica", "nicaragua", "panama", "panamá", "el salvador", "salvador", "cr", "ni", "pa", "sv", "slv"]
 
 WELCOME_MESSAGE = (
     "¡Bienvenido! ¿Desde qué país nos visitas?\n"
@@ -65,144 +60,63 @@ COURTESY_KEYWORDS = {
     "chao": "¡Chao! ¡Que tengas un excelente día! 👋"
 }
 
-# Frases que no queremos que el modelo devuelva (bloqueo/hard filters)
-BLOCKLIST_SNIPPETS = [
-    "soy un asistente de ai", "puedo ayudarte con programación", "no tengo información sobre ti",
-    "puedo ayudarte con temas generales", "estoy aquí para ayudarte", "según internet",
-    "encontré en la web", "puedes buscar en google", "paypal", "tarjeta crédito", "interbancario",
-    "asistente virtual", "como modelo de lenguaje", "no tengo acceso a internet"
+NEGATIVE_FEEDBACK_PHRASES = [
+    "no", "no es eso", "eso no era", "incorrecto", "equivocado",
+    "no me sirve", "no responde", "no aplica", "nada que ver"
 ]
 
-# ---------------------------------
-# Rutas de logs para entrenamiento
-# ---------------------------------
-LOG_DIR = "logs"
-TRAIN_FILE = os.path.join(LOG_DIR, "training_data.jsonl")  # para mejorar keywords/intenciones
-LAST_PRED_FILE = os.path.join(LOG_DIR, "last_predictions.json")  # estado por usuario
-NOCTX_FILE = os.path.join(LOG_DIR, "no_context_log.json")
+# Comandos de sesión (mensaje normalizado -> acción)
+CMD_RESET = "reset"
+CMD_COUNTRY_MENU = "country_menu"
+SESSION_COMMANDS = {
+    **{c: CMD_RESET for c in ("reiniciar", "reset", "limpiar", "borrar")},
+    **{c: CMD_COUNTRY_MENU for c in ("cambiar pais", "cambiar país", "menu", "menú", "pais", "país")},
+}
+
+NO_INFO_MESSAGE = "Lo siento, no encontré información para ayudarte con eso. ¿Podés reformular tu pregunta?"
+
+# Router de intenciones compilado una sola vez al importar el módulo
+INTENT_ROUTER = IntentRouter(
+    negatives=NEGATIVE_FEEDBACK_PHRASES,
+    commands=SESSION_COMMANDS,
+    country_codes=COUNTRY_CODES,
+    country_labels=COUNTRY_LABELS,
+    courtesy=COURTESY_KEYWORDS,
+)
 
 # ---------------------------------
 # Utilidades varias
 # ---------------------------------
-def _normalize_basic(text: str) -> str:
-    return re.sub(r'\s+', ' ', text.strip().lower())
-
-def _is_only_emojis(text: str) -> bool:
-    return bool(re.fullmatch(r'[\W_]+', text.strip()))
-
-def _map_country_freeform(message: str) -> Optional[str]:
-    msg = _normalize_basic(message)
-    if msg in COUNTRY_CODES:
-        return COUNTRY_CODES[msg]
-    labels = ["costa rica", "nicaragua", "panama", "panamá", "el salvador", "salvador", "cr", "ni", "pa", "sv", "slv"]
-    best, score = None, 0.0
-    for lab in labels:
-        r = difflib.SequenceMatcher(None, msg, lab).ratio()
-        if r > score:
-            best, score = lab, r
-    if best and score >= 0.72:
-        return COUNTRY_CODES.get(best, None)
-    return None
-
-def is_country_selection(message: str) -> bool:
-    return _map_country_freeform(message) is not None
-
-def enrich_links(text: str) -> str:
-    """Envuelve URLs en <a> salvo que ya estén en un <a>."""
-    def _repl(m):
-        url = m.group(0)
-        left = text[max(0, m.start()-3):m.start()]
-        right = text[m.end():min(len(text), m.end()+4)]
-        if left.endswith('="') or left.endswith('>') or right.startswith('</a'):
-            return url
-        return f'<a href="{url}" target="_blank">{url}</a>'
-    return re.sub(r'(https?://[^\s<]+)', _repl, text)
-
-def detectar_cortesia(user_msg: str) -> Optional[str]:
-    msg = _normalize_basic(user_msg)
-    msg = re.sub(r'[!¡.,;:?¿]', '', msg)
-    tokens = msg.split()
-    if not tokens or _is_only_emojis(user_msg):
-        return None
-
-    cortesias = list(COURTESY_KEYWORDS.keys())
-    mensaje_corto = len(tokens) <= 4
-
-    mejor_match = None
-    mejor_score = 0.0
-
-    for frase in cortesias:
-        frase_tokens = frase.split()
-        coincidencias = 0
-        for token in tokens:
-            for ft in frase_tokens:
-                score = difflib.SequenceMatcher(None, token, ft).ratio()
-                if score >= 0.75:
-                    coincidencias += 1
-                    break
-        ratio = coincidencias / max(1, len(frase_tokens))
-        if ratio >= 0.75 and ratio > mejor_score:
-            mejor_match = frase
-            mejor_score = ratio
-
-    if mejor_match and mensaje_corto:
-        return COURTESY_KEYWORDS[mejor_match]
-    return None
-
-def _ensure_logdir():
-    os.makedirs(LOG_DIR, exist_ok=True)
-
+# Los logs son JSONL de solo agregar: el request nunca reescribe un archivo
+# completo y el mantenimiento puede compactarlos sin perder líneas.
 def record_training_sample(sample: dict):
     """Guarda interacciones para entrenar (jsonl)."""
-    _ensure_logdir()
     sample["ts"] = datetime.utcnow().isoformat()
-    with open(TRAIN_FILE, "a", encoding="utf-8") as f:
-        f.write(json.dumps(sample, ensure_ascii=False) + "\n")
+    append_jsonl(TRAIN_FILE, sample)
 
 def set_last_prediction(user_id: str, pred: dict):
-    """Guarda última predicción por usuario (para feedback)."""
-    _ensure_logdir()
-    data = {}
-    if os.path.exists(LAST_PRED_FILE):
-        try:
-            with open(LAST_PRED_FILE, "r", encoding="utf-8") as f:
-                data = json.load(f) or {}
-        except Exception:
-            data = {}
-    data[user_id] = pred
-    with open(LAST_PRED_FILE, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    """Guarda última predicción por usuario (para feedback); la última línea del usuario manda."""
+    append_jsonl(LAST_PRED_FILE, {"user_id": user_id, "pred": pred, "ts": datetime.utcnow().isoformat()})
 
 def get_last_prediction(user_id: str) -> Optional[dict]:
-    if not os.path.exists(LAST_PRED_FILE):
-        return None
-    try:
-        with open(LAST_PRED_FILE, "r", encoding="utf-8") as f:
-            data = json.load(f) or {}
-            return data.get(user_id)
-    except Exception:
-        return None
-
-def detect_negative_feedback(user_msg: str) -> bool:
-    m = _normalize_basic(user_msg)
-    negatives = [
-        "no", "no es eso", "eso no era", "incorrecto", "equivocado",
-        "no me sirve", "no responde", "no aplica", "nada que ver"
-    ]
-    return any(m == n or n in m for n in negatives)
-
-def log_no_context_question(question: str, answer: str):
-    _ensure_logdir()
-    data: List[dict] = []
-    if os.path.exists(NOCTX_FILE):
+    # Desde el final: el feedback suele llegar justo después de la predicción
+    limite = datetime.utcnow() - timedelta(seconds=LAST_PREDICTION_TTL)
+    for record in iter_jsonl_reverse(LAST_PRED_FILE):
+        if not isinstance(record, dict):
+            continue
         try:
-            with open(NOCTX_FILE, "r", encoding="utf-8") as f:
-                data = json.load(f) or []
-        except json.JSONDecodeError:
-            data = []
-    data.append({"question": question, "answer": answer, "ts": datetime.utcnow().isoformat()})
-    with open(NOCTX_FILE, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
+            ts = datetime.fromisoformat(record.get("ts"))
+        except (TypeError, ValueError):
+            continue
+        if ts < limite:
+            return None  # lo anterior ya venció
+        if record.get("user_id") == user_id:
+            return record.get("pred")
+    return None
+
+def log_no_context_question(question: str, answer: str, country: Optional[str] = None):
+    append_jsonl(NOCTX_FILE, {"question": question, "answer": answer, "country": country,
+                              "ts": datetime.utcnow().isoformat()})
 
 def call_ollama(messages: list) -> str:
     payload = {
@@ -212,6 +126,7 @@ def call_ollama(messages: list) -> str:
         "options": {"temperature": 0}
     }
     try:
+        import requests  # diferido: solo se paga cuando realmente se usa el LLM
         response = requests.post(OLLAMA_URL, json=payload, timeout=30)
         response.raise_for_status()
         data = response.json()
@@ -221,40 +136,10 @@ def call_ollama(messages: list) -> str:
         return f"Error al contactar con Ollama: {e}"
 
 def sanitize_model_output(text: str) -> Tuple[str, bool]:
-    if not text:
-        return "", True
-    t = text.strip()
-    low = t.lower()
-
-    if "error al contactar con ollama" in low:
-        return t, True
-
-    if any(snippet in low for snippet in BLOCKLIST_SNIPPETS):
-        return t, True
-
-    generic_patterns = [
-        r"no (tengo|tengo suficiente) información",
-        r"no puedo ayudarte con eso",
-        r"no estoy seguro",
-        r"no encontr[ée] información",
-        r"no recib[ií] respuesta"
-    ]
-    if any(re.search(p, low) for p in generic_patterns):
-        return t, True
-
-    return t, False
+    return GUARD_ENGINE.sanitize(text)
 
 def response_grounded_in_context(model_text: str, context: str) -> bool:
-    low = model_text.lower()
-    ctx = context.lower()
-    for term in FORBIDDEN_TERMS:
-        if term in low and term not in ctx:
-            return False
-    urls = re.findall(r'https?://[^\s<>"\)]+', model_text, flags=re.I)
-    for u in urls:
-        if u.lower() not in ctx:
-            return False
-    return True
+    return GUARD_ENGINE.grounded(model_text, context)
 
 # ---------------------------------
 # Construcción de mensajes a LLM
@@ -279,17 +164,16 @@ def build_ollama_messages(user_id: str, context: str, history: list, user_msg: s
 # ---------------------------------
 # Comandos de sesión
 # ---------------------------------
-def _maybe_handle_command(user_id: str, user_msg: str) -> Optional[str]:
-    msg = _normalize_basic(user_msg)
-    if msg in {"reiniciar", "reset", "limpiar", "borrar"}:
+def _run_command(user_id: str, cmd: str) -> Optional[str]:
+    if cmd == CMD_RESET:
         reset_user_history(user_id)
         set_context(user_id, "")
         set_last_prediction(user_id, None)
         return "He reiniciado tu sesión. ¿Desde qué país nos visitas?\n" + WELCOME_MESSAGE
-    if msg in {"cambiar pais", "cambiar país", "menu", "menú", "pais", "país"}:
+    if cmd == CMD_COUNTRY_MENU:
         reset_user_history(user_id)
         set_context(user_id, "")
-        set_user_country(user_id, None)
+        set_user_country_folder(user_id, None)
         set_last_prediction(user_id, None)
         return WELCOME_MESSAGE
     return None
@@ -298,14 +182,19 @@ def _maybe_handle_command(user_id: str, user_msg: str) -> Optional[str]:
 # Flujo principal
 # ---------------------------------
 def handle_message(user_id: str, user_msg: str, channel='web') -> str:
+    user_country = get_user_country(user_id)
+
+    # Una sola clasificación decide a qué subsistema despachar
+    intent = INTENT_ROUTER.classify(user_msg, expect_country=not user_country)
+
     # Feedback negativo: registra desaciertos del último turno
-    if detect_negative_feedback(user_msg):
+    if intent.kind == INTENT_NEGATIVE:
         last = get_last_prediction(user_id)
         if last:
             record_training_sample({
                 "label": "negative",
                 "user_id": user_id,
-                "country": get_user_country(user_id),
+                "country": user_country,
                 "user_msg": last.get("user_msg"),
                 "selected": last.get("selected"),
                 "alternatives": last.get("alternatives"),
@@ -314,16 +203,13 @@ def handle_message(user_id: str, user_msg: str, channel='web') -> str:
         return "Gracias por avisar. ¿Podés decirme con qué tema específico necesitás ayuda para mejorar la respuesta?"
 
     # Comandos rápidos
-    cmd = _maybe_handle_command(user_id, user_msg)
-    if cmd:
-        return cmd
-
-    user_country = get_user_country(user_id)
+    if intent.kind == INTENT_COMMAND:
+        return _run_command(user_id, intent.value)
 
     # Selección de país
-    if not user_country:
-        if is_country_selection(user_msg):
-            new_code = _map_country_freeform(user_msg)
+    if intent.kind == INTENT_COUNTRY:
+        if intent.value:
+            new_code = intent.value
             set_user_country(user_id, new_code)
             reset_user_history(user_id)
             set_last_prediction(user_id, None)
@@ -333,21 +219,20 @@ def handle_message(user_id: str, user_msg: str, channel='web') -> str:
             return WELCOME_MESSAGE
 
     # Cortesías
-    respuesta_cortesia = detectar_cortesia(user_msg)
-    if respuesta_cortesia:
-        return respuesta_cortesia
+    if intent.kind == INTENT_COURTESY:
+        return intent.value
 
     # Contexto actualizado (para LLM si se usa)
-    nuevo_contexto = build_context(user_msg, user_id)
-    if nuevo_contexto.strip():
-        set_context(user_id, nuevo_contexto)
-
-    context = get_context(user_id)
+    nuevo_contexto = build_context(
+        user_msg, user_id,
+        want_locations=intent.wants_locations, want_hours=intent.wants_hours
+    )
+    context = refresh_context(user_id, nuevo_contexto)
 
     # Si no hay contexto utilizable, guardamos y devolvemos fallback
     if context.strip() == "":
-        fallback = "Lo siento, no encontré información para ayudarte con eso. ¿Podés reformular tu pregunta?"
-        log_no_context_question(user_msg, fallback)
+        fallback = NO_INFO_MESSAGE
+        log_no_context_question(user_msg, fallback, user_country)
         update_history(user_id, user_msg, fallback)
         set_last_prediction(user_id, None)
         return fallback
@@ -355,7 +240,7 @@ def handle_message(user_id: str, user_msg: str, channel='web') -> str:
     # *** DECISIÓN DE RESPUESTA ***
     # Intentamos clasificar y responder directo del dataset
     answer_html, score, faq_id, intent, canon_question = top_faq_answer(
-        user_msg, user_id, min_score=0.0
+        user_msg, user_id, min_score=0.0, channel=channel
     )
 
     if answer_html and score >= LLM_THRESHOLD:
@@ -378,13 +263,12 @@ def handle_message(user_id: str, user_msg: str, channel='web') -> str:
         })
 
         # Interpretación SOLO basada en 'pregunta' del dataset (sin prefijos)
+        # Respuesta e interpretación vienen pre-renderizadas para el canal
         interpretation = ""
         if SHOW_INTERPRETATION and canon_question:
-            interpretation = f"Interpreté tu consulta como: {canon_question}.\n\n"
+            interpretation = interpretation_line(canon_question, channel)
 
         final_msg = f"{interpretation}{answer_html}"
-        if channel == 'web':
-            final_msg = enrich_links(final_msg)
 
         update_history(user_id, user_msg, final_msg)
         return final_msg
@@ -402,8 +286,8 @@ def handle_message(user_id: str, user_msg: str, channel='web') -> str:
             bloqueado = True
 
     if bloqueado or bot_msg.strip() == "":
-        log_no_context_question(user_msg, bot_msg.strip())
-        bot_msg = "Lo siento, no encontré información para ayudarte con eso. ¿Podés reformular tu pregunta?"
+        log_no_context_question(user_msg, bot_msg.strip(), user_country)
+        bot_msg = NO_INFO_MESSAGE
 
     update_history(user_id, user_msg, bot_msg)
 
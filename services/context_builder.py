@@ -1,11 +1,8 @@
 # context_builder.py (RAG estricto + interpretación basada en preguntas del dataset)
-import re
 import difflib
-import unicodedata
-import hashlib
-import random
 from datetime import datetime
-from typing import List, Dict, Any, Tuple, Optional
+from functools import lru_cache
+from typing import List, Dict, Any, NamedTuple, Tuple, Optional, Set
 
 try:
     from zoneinfo import ZoneInfo
@@ -13,7 +10,12 @@ try:
 except Exception:
     _TZ = None
 
-from utils.country_selector import load_faqs, load_direcciones, load_horarios, get_user_country
+from utils.country_selector import (
+    load_faqs, load_faqs_for_country, load_dataset, get_user_country
+)
+from utils.normalization import normalize_text, NORMALIZE_CACHE_SIZE
+from utils.phonetic import build_phonetic_index, phonetic_lookup
+from services.answer_renderer import prepare_faq, rendered_answer
 
 URL_CENTROS = {
     "cr": "https://www.instacredit.com/centros_de_negocio/",
@@ -22,32 +24,28 @@ URL_CENTROS = {
     "slv": "https://www.instacredit.sv/centros_de_negocio/"
 }
 
-def get_centros_url(user_id: str) -> str:
-    country = (get_user_country(user_id) or "").lower()
+def _resolve_country(user_id: str, country: Optional[str] = None) -> Optional[str]:
+    """Carpeta de país explícita (uso sin sesión, p.ej. batch) o la del usuario."""
+    return country or get_user_country(user_id)
+
+def get_centros_url(user_id: str, country: Optional[str] = None) -> str:
+    country = (_resolve_country(user_id, country) or "").lower()
     return URL_CENTROS.get(country, URL_CENTROS["cr"])
 
 # ------------------------
 # Normalización y tokens
 # ------------------------
-_PUNC_RE = re.compile(r"[!¡.,;:?¿\-\(\)\[\]\{\}<>\"'`/\\]")
-
 def _normalize_text(text: str) -> str:
-    if not text:
-        return ""
-    text = text.lower()
-    text = ''.join(c for c in unicodedata.normalize('NFD', text)
-                   if unicodedata.category(c) != 'Mn')
-    text = _PUNC_RE.sub(" ", text)
-    text = re.sub(r"(.)\1{2,}", r"\1", text)  # holaaa -> hola
-    text = re.sub(r"\s+", " ", text).strip()
-    return text
+    return normalize_text(text)
 
-def normalize_tokens(text: str) -> List[str]:
-    text = _normalize_text(text)
-    tokens = text.split()
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def _normalized_tokens(text: str) -> Tuple[str, ...]:
+    tokens = normalize_text(text).split()
     # singularización ligera
-    tokens = [t[:-1] if t.endswith('s') and len(t) > 3 else t for t in tokens]
-    return tokens
+    return tuple(t[:-1] if t.endswith('s') and len(t) > 3 else t for t in tokens)
+
+def normalize_tokens(text: str) -> List[str]:
+    return list(_normalized_tokens(text or ""))
 
 # ------------------------
 # Scoring semántico simple
@@ -118,31 +116,8 @@ def score_match(user_msg: str, user_tokens: List[str], faq: Dict[str, Any]) -> f
     return min(score, 1.0)
 
 # ------------------------
-# Variantes de respuesta y CTAs
+# Saludo
 # ------------------------
-def pick_response_variant(respuestas: List[str], user_id: str, user_msg: str) -> str:
-    if not respuestas:
-        return ""
-    key = hashlib.sha256((user_id + "||" + user_msg).encode("utf-8")).hexdigest()
-    seed = int(key[:8], 16)
-    rnd = random.Random(seed)
-    return rnd.choice(respuestas)
-
-def render_acciones(acciones: List[Dict[str, str]]) -> str:
-    if not acciones:
-        return ""
-    htmls = []
-    for a in acciones:
-        label = a.get("label", "Abrir enlace")
-        url = a.get("url", "#")
-        htmls.append(f'<a href="{url}" target="_blank">{label}</a>')
-    return " • ".join(htmls)
-
-def fix_links_html(text: str) -> str:
-    text = re.sub(r'<a href="(<a href="[^"]+">[^<]+</a>)"[^>]*>[^<]+</a>', r'\1', text)
-    text = re.sub(r'<a href="([^"]+)"[^>]*>\1</a>', r'<a href="\1" target="_blank">Ver enlace</a>', text)
-    return text
-
 def generar_saludo_local() -> str:
     now = datetime.now(_TZ) if _TZ else datetime.now()
     hour = now.hour
@@ -158,60 +133,50 @@ def generar_saludo_local() -> str:
 # ------------------------
 def rank_faqs(user_msg: str, user_id: str) -> List[Tuple[float, Dict[str, Any]]]:
     """Retorna lista [(score, faq_dict)] ordenada desc por score."""
-    faqs: List[Dict[str, Any]] = load_faqs(user_id) or []
+    return rank_faq_list(user_msg, load_faqs(user_id) or [])
+
+def rank_faqs_for_country(user_msg: str, country_folder: str) -> List[Tuple[float, Dict[str, Any]]]:
+    """Igual que rank_faqs pero sin sesión: recibe directamente la carpeta del país."""
+    return rank_faq_list(user_msg, load_faqs_for_country(country_folder) or [])
+
+def rank_faq_list(user_msg: str, faqs: List[Dict[str, Any]]) -> List[Tuple[float, Dict[str, Any]]]:
     if not isinstance(faqs, list):
         return []
     user_tokens = normalize_tokens(user_msg)
     scored: List[Tuple[float, Dict[str, Any]]] = []
     for faq in faqs:
-        if "respuestas" not in faq and "respuesta" in faq:
-            r = faq.get("respuesta", "")
-            faq["respuestas"] = [r] if r else []
+        prepare_faq(faq)
         s = score_match(user_msg, user_tokens, faq)
         if s > 0:
             scored.append((s, faq))
     scored.sort(key=lambda x: x[0], reverse=True)
     return scored
 
-def buscar_faqs_relevantes(user_msg: str, user_id: str, top_k: int = 4, min_score: float = 0.38) -> List[str]:
+def buscar_faqs_relevantes(user_msg: str, user_id: str, top_k: int = 4, min_score: float = 0.38,
+                           country: Optional[str] = None) -> List[str]:
     """
     Devuelve lista de respuestas listas para mostrar (SIN prefijos tipo/subtipo).
     """
-    scored = rank_faqs(user_msg, user_id)
+    scored = rank_faqs_for_country(user_msg, _resolve_country(user_id, country))
     if not scored:
         return []
     mejores = [x for x in scored[:top_k] if x[0] >= min_score]
+    return [rendered_answer(faq, user_id, user_msg) for score, faq in mejores]
 
-    relacionados: List[str] = []
-    for score, faq in mejores:
-        variante = pick_response_variant(faq.get("respuestas", []), user_id, user_msg)
-        variante = fix_links_html(variante)
-        acciones_html = render_acciones(faq.get("acciones", []))
-        if acciones_html:
-            relacionados.append(f"{variante} {acciones_html}")
-        else:
-            relacionados.append(f"{variante}")
-    return relacionados
-
-def top_faq_answer(user_msg: str, user_id: str, min_score: float = 0.45) -> Tuple[Optional[str], float, Optional[str], Optional[str], Optional[str]]:
+def top_faq_answer(user_msg: str, user_id: str, min_score: float = 0.45,
+                   channel: Optional[str] = None) -> Tuple[Optional[str], float, Optional[str], Optional[str], Optional[str]]:
     """
     Devuelve (answer_html, score, faq_id, intencion, pregunta_canon) de la mejor FAQ
     o (None, 0, None, None, None) si no supera min_score.
+    Con channel='web' la respuesta ya viene con los enlaces enriquecidos.
     """
     scored = rank_faqs(user_msg, user_id)
-    if not scored:
+    # La lista viene ordenada: solo se renderiza la primera
+    if not scored or scored[0][0] < min_score:
         return (None, 0.0, None, None, None)
-    best_ans: Tuple[Optional[str], float, Optional[str], Optional[str], Optional[str]] = (None, 0.0, None, None, None)
-    for s, faq in scored:
-        if s < min_score:
-            continue
-        variante = pick_response_variant(faq.get("respuestas", []), user_id, user_msg)
-        variante = fix_links_html(variante)
-        acciones_html = render_acciones(faq.get("acciones", []))
-        html = f"{variante}" + (f" {acciones_html}" if acciones_html else "")
-        if s > best_ans[1]:
-            best_ans = (html, s, faq.get("id"), faq.get("intencion"), faq.get("pregunta"))
-    return best_ans
+    s, faq = scored[0]
+    html = rendered_answer(faq, user_id, user_msg, channel)
+    return (html, s, faq.get("id"), faq.get("intencion"), faq.get("pregunta"))
 
 # ------------------------
 # Direcciones y horarios
@@ -226,74 +191,141 @@ def _contains_any_synonym(user_msg: str, syns: List[str]) -> bool:
     norm = normalize_tokens(user_msg)
     return any(s in norm for s in syns)
 
-def tokens_match(user_tokens: list, keyword_tokens: list, threshold: float = 0.85) -> bool:
-    for ut in user_tokens:
-        for kt in keyword_tokens:
-            if difflib.SequenceMatcher(None, ut, kt).ratio() >= threshold:
-                return True
-    return False
-
-def buscar_direcciones(user_msg: str, user_id: str) -> List[str]:
-    direcciones = load_direcciones(user_id) or []
+LOCATION_FUZZY_THRESHOLD = 0.82
+FUZZY_TOKEN_CACHE_SIZE = 4096
+# Palabras de la consulta que no nombran un lugar: no pasan por difflib
+# (p.ej. "queda" ~ "quesada" traía San Carlos en casi cualquier pregunta)
+FUZZY_SKIP_TOKENS = frozenset(DIR_SYNONYMS + HOR_SYNONYMS + [
+    'queda', 'quedan', 'esta', 'estan', 'hay', 'cerca', 'frente', 'para', 'por',
+    'del', 'los', 'las', 'una', 'que', 'cual', 'como', 'tienen', 'tiene', 'hoy',
+])
+
+class _EntryIndex(NamedTuple):
+    entries: Any                   # lista del dataset indexada (se compara por identidad)
+    phonetic: Dict[str, Set[int]]  # clave fonética -> posiciones
+    vocab: Dict[str, Set[int]]     # token normalizado -> posiciones (para difflib)
+    fuzzy: Dict[str, Set[int]]     # token del usuario -> posiciones por difflib (caché)
+
+# Índices por (país, archivo); se reconstruyen si cambia el dataset
+_phonetic_cache: Dict[Tuple[str, str], _EntryIndex] = {}
+
+def _direccion_tokens(d: Dict[str, Any]) -> List[str]:
+    kw_norm: List[str] = normalize_tokens(d.get("zona", ""))
+    for k in d.get("keywords", []) + d.get("keywords_normalized", []):
+        kw_norm += normalize_tokens(k)
+    return list(set(kw_norm))
+
+def _horario_tokens(h: Dict[str, Any]) -> List[str]:
+    return normalize_tokens(h.get('CDN', ''))
+
+def _phonetic_index(country: str, filename: str, entries: List[Dict[str, Any]],
+                    tokens_of) -> _EntryIndex:
+    cached = _phonetic_cache.get((country, filename))
+    if cached and cached.entries is entries:
+        return cached
+    token_lists = [tokens_of(e) for e in entries]
+    vocab: Dict[str, Set[int]] = {}
+    for pos, tokens in enumerate(token_lists):
+        for t in tokens:
+            vocab.setdefault(t, set()).add(pos)
+    index = _EntryIndex(entries, build_phonetic_index(token_lists), vocab, {})
+    _phonetic_cache[(country, filename)] = index
+    return index
+
+def _fuzzy_positions(index: _EntryIndex, token: str) -> Set[int]:
+    """Posiciones con algún token similar (difflib) a `token`; cada token del vocabulario se compara una vez."""
+    cached = index.fuzzy.get(token)
+    if cached is not None:
+        return cached
+    hits: Set[int] = set()
+    for kt, positions in index.vocab.items():
+        if difflib.SequenceMatcher(None, token, kt).ratio() >= LOCATION_FUZZY_THRESHOLD:
+            hits |= positions
+    if len(index.fuzzy) >= FUZZY_TOKEN_CACHE_SIZE:
+        index.fuzzy.clear()
+    index.fuzzy[token] = hits
+    return hits
+
+def _match_entries(country: str, filename: str, entries: List[Dict[str, Any]],
+                   tokens_of, user_tokens: List[str]) -> List[int]:
+    """
+    Posiciones que coinciden por clave fonética. Los tokens sin clave conocida
+    pasan por difflib uno a uno, así un lugar bien escrito ("iglesia") no
+    oculta una sucursal mal escrita ("alajuella") en la misma consulta.
+    """
+    index = _phonetic_index(country, filename, entries, tokens_of)
+    hits, sin_clave = phonetic_lookup(index.phonetic, user_tokens)
+    for t in sin_clave:
+        if len(t) > 2 and t not in FUZZY_SKIP_TOKENS:
+            hits |= _fuzzy_positions(index, t)
+    return sorted(hits)
+
+def buscar_direcciones(user_msg: str, user_id: str, country: Optional[str] = None) -> List[str]:
+    country = _resolve_country(user_id, country)
+    direcciones = load_dataset(country, 'direcciones.json') or []
     tokens = normalize_tokens(user_msg)
     relacionados: List[str] = []
 
-    for d in direcciones:
-        zona_tokens = normalize_tokens(d.get("zona", ""))
-        keywords = d.get("keywords", [])
-        keywords_normalized = d.get("keywords_normalized", [])
-
-        kw_norm: List[str] = []
-        for k in keywords + keywords_normalized:
-            kw_norm += normalize_tokens(k)
-
-        keywords_combined_normalized = list(set(zona_tokens + kw_norm))
-
-        if tokens_match(tokens, keywords_combined_normalized, threshold=0.82):
-            waze = d.get('waze', '').strip()
-            waze_html = f' Waze: <a href="{waze}" target="_blank">Ver en Waze</a>' if waze else ""
-            relacionados.append(f"{d.get('zona','Zona')}: {d.get('direccion','(sin dirección)')}.{waze_html}")
+    for i in _match_entries(country, 'direcciones.json', direcciones, _direccion_tokens, tokens):
+        d = direcciones[i]
+        waze = d.get('waze', '').strip()
+        waze_html = f' Waze: <a href="{waze}" target="_blank">Ver en Waze</a>' if waze else ""
+        relacionados.append(f"{d.get('zona','Zona')}: {d.get('direccion','(sin dirección)')}.{waze_html}")
 
     if not relacionados:
-        url = get_centros_url(user_id)
+        url = get_centros_url(user_id, country)
         relacionados.append(f"No encontré la dirección que buscás. Podés consultarla en: <a href=\"{url}\" target=\"_blank\">Centros de Negocio</a>")
     return relacionados
 
-def buscar_horarios(user_msg: str, user_id: str) -> List[str]:
-    horarios = load_horarios(user_id) or []
+def buscar_horarios(user_msg: str, user_id: str, country: Optional[str] = None) -> List[str]:
+    country = _resolve_country(user_id, country)
+    horarios = load_dataset(country, 'horarios.json') or []
     tokens = normalize_tokens(user_msg)
     relacionados: List[str] = []
-    for h in horarios:
-        cdn_tokens = normalize_tokens(h.get('CDN', ''))
-        if tokens_match(tokens, cdn_tokens, threshold=0.82):
-            lv = h.get('Horario lunes a viernes', h.get('lunes_viernes', ''))
-            sa = h.get('Sabados', h.get('sabado', ''))
-            do = h.get('domingos', h.get('domingo', ''))
-            relacionados.append(f"{h.get('CDN','Sucursal')}: lun-vie {lv}, sáb {sa}, dom {do}")
+    for i in _match_entries(country, 'horarios.json', horarios, _horario_tokens, tokens):
+        h = horarios[i]
+        lv = h.get('Horario lunes a viernes', h.get('lunes_viernes', ''))
+        sa = h.get('Sabados', h.get('sabado', ''))
+        do = h.get('domingos', h.get('domingo', ''))
+        relacionados.append(f"{h.get('CDN','Sucursal')}: lun-vie {lv}, sáb {sa}, dom {do}")
     if not relacionados:
-        url = get_centros_url(user_id)
+        url = get_centros_url(user_id, country)
         relacionados.append(f"No encontré el horario solicitado. Podés consultarlo en: <a href=\"{url}\" target=\"_blank\">Centros de Negocio</a>")
     return relacionados
 
 # ------------------------
 # Contexto inteligente (para LLM si se usa)
 # ------------------------
-def build_context(message: str, user_id: str) -> str:
+def build_context(message: str, user_id: str,
+                  want_locations: Optional[bool] = None,
+                  want_hours: Optional[bool] = None,
+                  country: Optional[str] = None) -> str:
+    """
+    want_locations / want_hours permiten reutilizar la clasificación del router
+    de intenciones; si son None se detectan aquí por sinónimos.
+    country permite construir el contexto sin sesión de usuario.
+    """
+    country = _resolve_country(user_id, country)
+    if want_locations is None:
+        want_locations = _contains_any_synonym(message, DIR_SYNONYMS)
+    if want_hours is None:
+        want_hours = _contains_any_synonym(message, HOR_SYNONYMS)
+
     contexto: List[str] = []
 
-    faqs = buscar_faqs_relevantes(message, user_id)
+    faqs = buscar_faqs_relevantes(message, user_id, country=country)
     if faqs:
         contexto.append("FAQs relevantes:")
         contexto.extend(faqs)
 
-    if _contains_any_synonym(message, DIR_SYNONYMS):
-        direcciones = buscar_direcciones(message, user_id)
+    if want_locations:
+        direcciones = buscar_direcciones(message, user_id, country)
         if direcciones:
             contexto.append("\nDirecciones encontradas:")
             contexto.extend(direcciones)
 
-    if _contains_any_synonym(message, HOR_SYNONYMS):
-        horarios = buscar_horarios(message, user_id)
+    if want_hours:
+        horarios = buscar_horarios(message, user_id, country)
         if horarios:
             contexto.append("\nHorarios disponibles:")
             contexto.extend(horarios)
@@ -1,10 +1,11 @@
 # services/fb_messenger.py
 
-import requests
-from config import PAGE_ACCESS_TOKEN
+from config import PAGE_ACCESS_TOKEN, GRAPH_API_URL
 
 def send_fb_message(recipient_id: str, text: str):
-    url = f"https://graph.facebook.com/v19.0/me/messages?access_token={PAGE_ACCESS_TOKEN}"
+    import requests
+
+    url = f"{GRAPH_API_URL}/me/messages?access_token={PAGE_ACCESS_TOKEN}"
     payload = {
         "recipient": {"id": recipient_id},
         "message": {"text": text}
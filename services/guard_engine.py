@@ -0,0 +1,144 @@
+# services/guard_engine.py (filtros de salida del LLM)
+#
+# Reúne en un solo lugar las reglas que validan cada respuesta del modelo:
+#   - patrones genéricos (regex) -> una sola regex combinada
+#   - frases bloqueadas y términos sensibles -> tuplas de literales en
+#     minúsculas, recorridas con `in`; en CPython es más rápido que una
+#     alternancia de `re` con estas listas (ver tools/bench_guard.py)
+#   - términos y URLs permitidos -> se buscan directo en el contexto; cada
+#     contexto se valida una sola vez, así que precalcularlo no ahorra nada
+# Los valores por defecto viven solo aquí. data/guard_rules.json (opcional)
+# puede reemplazar cualquiera de las listas sin tocar código:
+#   {"forbidden_terms": [...], "blocklist_snippets": [...], "generic_patterns": [...]}
+
+import json
+import re
+from typing import Iterable, Tuple
+
+from config import GUARD_RULES_FILE
+
+# Términos sensibles que NO deben aparecer si no están en el contexto
+FORBIDDEN_TERMS = {
+    "hipotecario", "hipoteca", "hipotecarios",
+    "automotriz", "auto", "vehicular",
+    "empresarial", "empresa", "negocio",
+    "tarjeta de crédito", "tarjeta crédito"
+}
+
+# Frases que no queremos que el modelo devuelva (bloqueo/hard filters)
+BLOCKLIST_SNIPPETS = [
+    "soy un asistente de ai", "puedo ayudarte con programación", "no tengo información sobre ti",
+    "puedo ayudarte con temas generales", "estoy aquí para ayudarte", "según internet",
+    "encontré en la web", "puedes buscar en google", "paypal", "tarjeta crédito", "interbancario",
+    "asistente virtual", "como modelo de lenguaje", "no tengo acceso a internet"
+]
+
+# Respuestas evasivas del modelo (regex)
+GENERIC_PATTERNS = [
+    r"no (tengo|tengo suficiente) información",
+    r"no puedo ayudarte con eso",
+    r"no estoy seguro",
+    r"no encontr[ée] información",
+    r"no recib[ií] respuesta"
+]
+
+OLLAMA_ERROR_SNIPPET = "error al contactar con ollama"
+
+_URL_RE = re.compile(r'https?://[^\s<>"\)]+', re.I)
+
+# ---------------------------------
+# Implementaciones de referencia (comportamiento original)
+# ---------------------------------
+def sanitize_model_output_reference(text: str, blocklist=BLOCKLIST_SNIPPETS,
+                                    patterns=GENERIC_PATTERNS) -> Tuple[str, bool]:
+    if not text:
+        return "", True
+    t = text.strip()
+    low = t.lower()
+    if OLLAMA_ERROR_SNIPPET in low:
+        return t, True
+    if any(snippet in low for snippet in blocklist):
+        return t, True
+    if any(re.search(p, low) for p in patterns):
+        return t, True
+    return t, False
+
+def response_grounded_in_context_reference(model_text: str, context: str,
+                                           forbidden=FORBIDDEN_TERMS) -> bool:
+    low = model_text.lower()
+    ctx = context.lower()
+    for term in forbidden:
+        if term in low and term not in ctx:
+            return False
+    for u in re.findall(r'https?://[^\s<>"\)]+', model_text, flags=re.I):
+        if u.lower() not in ctx:
+            return False
+    return True
+
+# ---------------------------------
+# Motor con las reglas cargadas
+# ---------------------------------
+class GuardEngine:
+    def __init__(self, forbidden_terms: Iterable[str], blocklist_snippets: Iterable[str],
+                 generic_patterns: Iterable[str]):
+        self.forbidden_terms = frozenset(t.lower() for t in forbidden_terms if t)
+        self.blocklist_snippets = [s.lower() for s in blocklist_snippets if s]
+        self.generic_patterns = list(generic_patterns)
+
+        self._terms = tuple(sorted(self.forbidden_terms))
+        self._snippets = tuple(self.blocklist_snippets)
+        alternativas = [re.escape(OLLAMA_ERROR_SNIPPET)] + [f"(?:{p})" for p in self.generic_patterns]
+        self._block_re = re.compile("|".join(alternativas))
+
+    def sanitize(self, text: str) -> Tuple[str, bool]:
+        """(texto limpio, bloqueado). Misma salida que la implementación original."""
+        if not text:
+            return "", True
+        t = text.strip()
+        low = t.lower()
+        bloqueado = any(s in low for s in self._snippets) or self._block_re.search(low) is not None
+        return t, bloqueado
+
+    def grounded(self, model_text: str, context: str) -> bool:
+        """Sin términos sensibles ni URLs que no estén en el contexto."""
+        low = model_text.lower()
+        ctx = context.lower()
+        for t in self._terms:
+            if t in low and t not in ctx:
+                return False
+        for u in _URL_RE.findall(model_text):
+            if u.lower() not in ctx:
+                return False
+        return True
+
+def _rule_list(rules: dict, key: str, default):
+    value = rules.get(key, default)
+    if not isinstance(value, (list, set, frozenset)):
+        raise TypeError(f"'{key}' debe ser una lista")
+    return value
+
+def _default_engine() -> GuardEngine:
+    return GuardEngine(FORBIDDEN_TERMS, BLOCKLIST_SNIPPETS, GENERIC_PATTERNS)
+
+def load_guard_engine(path=GUARD_RULES_FILE) -> GuardEngine:
+    """Construye el motor con data/guard_rules.json si existe; si no, con los valores por defecto."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            rules = json.load(f) or {}
+    except FileNotFoundError:
+        return _default_engine()
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"⚠️ Reglas de guard inválidas en {path}, usando valores por defecto:", e)
+        return _default_engine()
+    # Una regex o un tipo inválido no debe impedir importar chat_service
+    try:
+        return GuardEngine(
+            _rule_list(rules, "forbidden_terms", FORBIDDEN_TERMS),
+            _rule_list(rules, "blocklist_snippets", BLOCKLIST_SNIPPETS),
+            _rule_list(rules, "generic_patterns", GENERIC_PATTERNS),
+        )
+    except (re.error, TypeError, AttributeError) as e:
+        print(f"⚠️ Reglas de guard inválidas en {path}, usando valores por defecto:", e)
+        return _default_engine()
+
+GUARD_ENGINE = load_guard_engine()
@@ -1,40 +1,73 @@
-
 import time
 import threading
+from contextlib import contextmanager
 from config import INACTIVITY_TIMEOUT
-import os
-import json
 
+# Cada usuario tiene un registro inmutable {"history": tuple, "last_time": float}
+# que se reemplaza completo al escribir (copy-on-write). Los lectores obtienen
+# una instantánea sin tomar locks; los escritores se serializan por franja
+# (lock striping) para que usuarios distintos no compitan entre sí.
 conversation_history = {}
 context_cache = {}
-history_lock = threading.Lock()
+
+LOCK_STRIPES = 64
+_locks = [threading.Lock() for _ in range(LOCK_STRIPES)]
+_contention = [0] * LOCK_STRIPES  # veces que un escritor tuvo que esperar
+
+def _stripe(user_id: str) -> int:
+    return hash(user_id) % LOCK_STRIPES
+
+@contextmanager
+def _user_lock(user_id: str):
+    idx = _stripe(user_id)
+    lock = _locks[idx]
+    if not lock.acquire(blocking=False):
+        lock.acquire()
+        _contention[idx] += 1  # ya con el lock: el contador no pierde incrementos
+    try:
+        yield
+    finally:
+        lock.release()
+
+@contextmanager
+def _all_locks():
+    for lock in _locks:
+        lock.acquire()
+    try:
+        yield
+    finally:
+        for lock in reversed(_locks):
+            lock.release()
 
 def update_history(user_id: str, user_msg: str, bot_msg: str):
-    with history_lock:
-        now = time.time()
-        hist_data = conversation_history.get(user_id, {"history": [], "last_time": now})
-        if now - hist_data["last_time"] > INACTIVITY_TIMEOUT:
-            hist_data["history"] = []
-        hist_data["history"].append({"role": "user", "content": user_msg})
-        hist_data["history"].append({"role": "assistant", "content": bot_msg})
-        hist_data["last_time"] = now
-        conversation_history[user_id] = hist_data
-
-def get_user_history(user_id: str) -> tuple[list, bool]:
-    with history_lock:
+    with _user_lock(user_id):
         now = time.time()
         hist_data = conversation_history.get(user_id)
-        if not hist_data:
-            return [], False
-        last_time = hist_data.get("last_time", now)
-        if now - last_time > INACTIVITY_TIMEOUT:
-            return [], True
-        return hist_data["history"], False
+        history = hist_data["history"] if hist_data else ()
+        if hist_data and now - hist_data["last_time"] > INACTIVITY_TIMEOUT:
+            history = ()
+        conversation_history[user_id] = {
+            "history": history + (
+                {"role": "user", "content": user_msg},
+                {"role": "assistant", "content": bot_msg},
+            ),
+            "last_time": now,
+        }
+
+def get_user_history(user_id: str) -> tuple[tuple, bool]:
+    """Instantánea inmutable del historial y si la sesión expiró."""
+    now = time.time()
+    hist_data = conversation_history.get(user_id)
+    if not hist_data:
+        return (), False
+    if now - hist_data["last_time"] > INACTIVITY_TIMEOUT:
+        return (), True
+    return hist_data["history"], False
 
 def reset_user_history(user_id: str):
-    with history_lock:
+    with _user_lock(user_id):
         conversation_history[user_id] = {
-            "history": [],
+            "history": (),
             "last_time": time.time()
         }
         context_cache[user_id] = ""
@@ -43,21 +76,36 @@ def get_context(user_id: str) -> str:
     return context_cache.get(user_id, "")
 
 def set_context(user_id: str, context: str):
-    context_cache[user_id] = context
+    with _user_lock(user_id):
+        context_cache[user_id] = context
+
+def refresh_context(user_id: str, new_context: str) -> str:
+    """Guarda new_context si no está vacío y devuelve el contexto vigente, atómicamente."""
+    with _user_lock(user_id):
+        if new_context.strip():
+            context_cache[user_id] = new_context
+        return context_cache.get(user_id, "")
 
 def reset_context(user_id: str):
-    context_cache[user_id] = ""
+    with _user_lock(user_id):
+        context_cache[user_id] = ""
 
 def clear_inactive_sessions(timeout=INACTIVITY_TIMEOUT):
-    with history_lock:
-        now = time.time()
-        to_clear = [uid for uid, data in conversation_history.items() if now - data["last_time"] > timeout]
-        for uid in to_clear:
-            del conversation_history[uid]
-            if uid in context_cache:
-                del context_cache[uid]
+    now = time.time()
+    candidatos = [uid for uid, data in list(conversation_history.items()) if now - data["last_time"] > timeout]
+    for uid in candidatos:
+        with _user_lock(uid):
+            data = conversation_history.get(uid)
+            # Se vuelve a comprobar: pudo haber escrito mientras tanto
+            if data and now - data["last_time"] > timeout:
+                del conversation_history[uid]
+                context_cache.pop(uid, None)
 
 def clear_all_histories():
-    with history_lock:
+    with _all_locks():
         conversation_history.clear()
         context_cache.clear()
+
+def lock_contention() -> dict:
+    """Esperas acumuladas por franja de lock (para detectar puntos calientes)."""
+    return {"stripes": LOCK_STRIPES, "waits": list(_contention), "total": sum(_contention)}
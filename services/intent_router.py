@@ -0,0 +1,225 @@
+# services/intent_router.py (clasificación rápida de intención antes del RAG)
+
+import re
+import difflib
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from services.context_builder import normalize_tokens, DIR_SYNONYMS, HOR_SYNONYMS
+
+INTENT_NEGATIVE = "negative"
+INTENT_COMMAND = "command"
+INTENT_COUNTRY = "country"
+INTENT_COURTESY = "courtesy"
+INTENT_FAQ = "faq"
+
+COURTESY_THRESHOLD = 0.75
+COUNTRY_THRESHOLD = 0.72
+COURTESY_MAX_TOKENS = 4
+
+_COURTESY_PUNC_RE = re.compile(r'[!¡.,;:?¿]')
+_ONLY_EMOJIS_RE = re.compile(r'[\W_]+')
+
+class Intent(NamedTuple):
+    kind: str
+    value: Optional[str] = None          # comando, código de país o respuesta de cortesía
+    wants_locations: bool = False
+    wants_hours: bool = False
+
+# ------------------------
+# Autómata Aho-Corasick
+# ------------------------
+def _is_word_char(ch: str) -> bool:
+    return ch.isalnum() or ch == "_"
+
+class AhoCorasick:
+    """
+    Autómata de búsqueda de múltiples frases en una sola pasada. Cada frase
+    lleva un dato asociado; solo cuentan las coincidencias en límites de
+    palabra ("no" no coincide dentro de "noches").
+    """
+
+    def __init__(self, patterns: Iterable[Tuple[str, Any]]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[Tuple[int, Any]]] = [[]]
+        for p, payload in patterns:
+            if p:
+                self._insert(p, payload)
+        self._build_failure_links()
+
+    def _insert(self, pattern: str, payload: Any):
+        state = 0
+        for ch in pattern:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = nxt
+        self._out[state].append((len(pattern), payload))
+
+    def _build_failure_links(self):
+        queue = list(self._goto[0].values())
+        i = 0
+        while i < len(queue):
+            state = queue[i]
+            i += 1
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                f = self._fail[state]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                target = self._goto[f].get(ch, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def _step(self, state: int, ch: str) -> int:
+        while state and ch not in self._goto[state]:
+            state = self._fail[state]
+        return self._goto[state].get(ch, 0)
+
+    def matches(self, text: str) -> List[Tuple[int, int, Any]]:
+        """(inicio, fin, dato) de cada frase encontrada como palabras completas."""
+        found: List[Tuple[int, int, Any]] = []
+        state = 0
+        n = len(text)
+        for i, ch in enumerate(text):
+            state = self._step(state, ch)
+            for length, payload in self._out[state]:
+                start, end = i + 1 - length, i + 1
+                if start > 0 and _is_word_char(text[start - 1]) and _is_word_char(text[start]):
+                    continue
+                if end < n and _is_word_char(text[end]) and _is_word_char(text[end - 1]):
+                    continue
+                found.append((start, end, payload))
+        return found
+
+# ------------------------
+# Similitud difusa (solo como último recurso)
+# ------------------------
+@lru_cache(maxsize=8192)
+def _similar(a: str, b: str, threshold: float) -> bool:
+    if a == b:
+        return True
+    sm = difflib.SequenceMatcher(None, a, b)
+    # Cotas superiores baratas antes de calcular ratio() completo
+    if sm.real_quick_ratio() < threshold or sm.quick_ratio() < threshold:
+        return False
+    return sm.ratio() >= threshold
+
+def _ratio(a: str, b: str) -> float:
+    return difflib.SequenceMatcher(None, a, b).ratio()
+
+def normalize_basic(text: str) -> str:
+    return re.sub(r'\s+', ' ', text.strip().lower())
+
+# ------------------------
+# Router
+# ------------------------
+class IntentRouter:
+    """
+    Clasifica un mensaje en una sola pasada: feedback negativo, comando,
+    país, cortesía o FAQ (con flags de ubicación/horario). Las tablas se
+    compilan una vez.
+    """
+
+    def __init__(self, negatives: Iterable[str], commands: Dict[str, str],
+                 country_codes: Dict[str, str], country_labels: Iterable[str],
+                 courtesy: Dict[str, str]):
+        self._country_codes = dict(country_codes)
+        self._country_labels = list(country_labels)
+        self._courtesy = dict(courtesy)
+        self._courtesy_phrases = [(frase, frase.split()) for frase in self._courtesy]
+        self._dir_synonyms = set(DIR_SYNONYMS)
+        self._hor_synonyms = set(HOR_SYNONYMS)
+        # Frases exactas en un solo autómata; el fuzzy queda como último recurso
+        self._phrases = AhoCorasick(
+            [(p, (INTENT_NEGATIVE, None)) for p in negatives]
+            + [(p, (INTENT_COMMAND, cmd)) for p, cmd in commands.items()]
+            + [(frase, (INTENT_COURTESY, pos)) for pos, frase in enumerate(self._courtesy)]
+        )
+
+    # --- Detectores individuales ---
+    def is_negative(self, msg_basic: str, hits=None) -> bool:
+        hits = self._phrases.matches(msg_basic) if hits is None else hits
+        return any(k == INTENT_NEGATIVE for _, _, (k, _) in hits)
+
+    def command(self, msg_basic: str, hits=None) -> Optional[str]:
+        hits = self._phrases.matches(msg_basic) if hits is None else hits
+        # Un comando tiene que ser el mensaje completo
+        for start, end, (k, cmd) in hits:
+            if k == INTENT_COMMAND and start == 0 and end == len(msg_basic):
+                return cmd
+        return None
+
+    def country(self, msg_basic: str) -> Optional[str]:
+        if msg_basic in self._country_codes:
+            return self._country_codes[msg_basic]
+        best, score = None, 0.0
+        for lab in self._country_labels:
+            r = _ratio(msg_basic, lab)
+            if r > score:
+                best, score = lab, r
+        if best and score >= COUNTRY_THRESHOLD:
+            return self._country_codes.get(best, None)
+        return None
+
+    def courtesy(self, user_msg: str, msg_basic: str, hits=None) -> Optional[str]:
+        tokens = _COURTESY_PUNC_RE.sub('', msg_basic).split()
+        # Solo los mensajes cortos pueden ser cortesías: evita el fuzzy en el resto
+        if not tokens or len(tokens) > COURTESY_MAX_TOKENS:
+            return None
+        if _ONLY_EMOJIS_RE.fullmatch(user_msg.strip()):
+            return None
+
+        # Frase exacta: la primera de la tabla gana, como en el fuzzy
+        hits = self._phrases.matches(msg_basic) if hits is None else hits
+        exactas = [pos for _, _, (k, pos) in hits if k == INTENT_COURTESY]
+        if exactas:
+            return self._courtesy[self._courtesy_phrases[min(exactas)][0]]
+
+        mejor_match = None
+        mejor_score = 0.0
+        for frase, frase_tokens in self._courtesy_phrases:
+            coincidencias = 0
+            for token in tokens:
+                for ft in frase_tokens:
+                    if _similar(token, ft, COURTESY_THRESHOLD):
+                        coincidencias += 1
+                        break
+            ratio = coincidencias / max(1, len(frase_tokens))
+            if ratio >= COURTESY_THRESHOLD and ratio > mejor_score:
+                mejor_match = frase
+                mejor_score = ratio
+        return self._courtesy[mejor_match] if mejor_match else None
+
+    # --- Clasificación completa ---
+    def classify(self, user_msg: str, expect_country: bool = False) -> Intent:
+        msg_basic = normalize_basic(user_msg)
+        hits = self._phrases.matches(msg_basic)
+
+        if self.is_negative(msg_basic, hits):
+            return Intent(INTENT_NEGATIVE)
+
+        cmd = self.command(msg_basic, hits)
+        if cmd:
+            return Intent(INTENT_COMMAND, cmd)
+
+        # Sin país elegido solo interesa la selección (o el menú de bienvenida)
+        if expect_country:
+            return Intent(INTENT_COUNTRY, self.country(msg_basic))
+
+        reply = self.courtesy(user_msg, msg_basic, hits)
+        if reply:
+            return Intent(INTENT_COURTESY, reply)
+
+        tokens = set(normalize_tokens(user_msg))
+        wants_locations = not tokens.isdisjoint(self._dir_synonyms)
+        wants_hours = not tokens.isdisjoint(self._hor_synonyms)
+        # Ubicación/horario no son intenciones aparte: los datasets tienen FAQs
+        # para esas preguntas ("¿dónde se ubican?"), así que el ranking de FAQs
+        # siempre corre y los flags solo agregan direcciones/horarios al contexto.
+        return Intent(INTENT_FAQ, None, wants_locations, wants_hours)
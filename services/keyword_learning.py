@@ -0,0 +1,226 @@
+# services/keyword_learning.py (aprendizaje incremental de keywords a partir de los logs)
+#
+# Lee logs/training_data.jsonl y logs/no_context_log.jsonl desde el último punto
+# procesado, acumula confusiones entre FAQs y propone keywords nuevas por FAQ.
+# Las propuestas se escriben en un archivo para revisión y, con apply=True,
+# en data/<pais>/faqs_overlay.json, que el ranker carga junto a faqs.json.
+
+import json
+import os
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from config import DATA_PATH, LLM_THRESHOLD
+from services.context_builder import rank_faq_list, _normalize_text
+from utils.country_selector import load_faqs_for_country, FAQ_OVERLAY_FILE
+from utils.jsonstream import iter_jsonl
+from utils.logfiles import LOG_DIR, TRAIN_FILE, NOCTX_FILE, logs_lock
+
+STATE_FILE = os.path.join(LOG_DIR, "keyword_learning_state.json")
+PROPOSALS_FILE = os.path.join(LOG_DIR, "keyword_proposals.json")
+
+CANDIDATE_MIN_SCORE = 0.5     # la FAQ candidata debe estar al menos así de cerca
+CANDIDATE_MIN_MARGIN = 0.1    # y separada de la segunda para no reforzar confusiones
+CONFUSION_MARGIN = 0.05       # dos FAQs a menos de esto se consideran confundidas
+MIN_SUPPORT = 2               # veces que debe verse un mensaje para proponerlo
+
+def _empty_state() -> dict:
+    return {
+        "training_offset": 0,
+        "no_context_offset": 0,
+        "corpus": {},      # pais -> {mensaje_normalizado: conteo}
+        "confusion": {},   # pais -> {"faq_a|faq_b": conteo}
+        "rejected": {},    # pais -> {faq_id: [mensajes con feedback negativo]}
+        "candidates": {},  # pais -> {faq_id: {mensaje_normalizado: conteo}}
+    }
+
+def load_state() -> dict:
+    if not os.path.exists(STATE_FILE):
+        return _empty_state()
+    try:
+        with open(STATE_FILE, "r", encoding="utf-8") as f:
+            state = json.load(f) or {}
+    except (OSError, json.JSONDecodeError):
+        return _empty_state()
+    base = _empty_state()
+    base.update(state)
+    return base
+
+def save_state(state: dict):
+    os.makedirs(LOG_DIR, exist_ok=True)
+    tmp = STATE_FILE + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, STATE_FILE)
+
+def adjust_offsets(training_rotated: bool = False, no_context_removed: int = 0):
+    """Llamado por el mantenimiento de logs (con el lock exclusivo) tras rotar o compactar archivos."""
+    if not os.path.exists(STATE_FILE):
+        return
+    state = load_state()
+    if training_rotated:
+        state["training_offset"] = 0
+    state["no_context_offset"] = max(0, state["no_context_offset"] - no_context_removed)
+    save_state(state)
+
+# ---------------------------------
+# Agregación
+# ---------------------------------
+def _bump(table: dict, country: str, key: str, sub: Optional[str] = None):
+    bucket = table.setdefault(country, {})
+    if sub is None:
+        bucket[key] = bucket.get(key, 0) + 1
+    else:
+        inner = bucket.setdefault(key, {})
+        inner[sub] = inner.get(sub, 0) + 1
+
+def _top_two(msg: str, faqs: List[dict]) -> Tuple[float, Optional[dict], float]:
+    ranked = rank_faq_list(msg, faqs)
+    if not ranked:
+        return 0.0, None, 0.0
+    second = ranked[1][0] if len(ranked) > 1 else 0.0
+    return ranked[0][0], ranked[0][1], second
+
+def _consume_training(state: dict) -> int:
+    procesados = 0
+    for sample, offset in iter_jsonl(TRAIN_FILE, state["training_offset"]):
+        state["training_offset"] = offset
+        procesados += 1
+        country = sample.get("country")
+        msg = _normalize_text(sample.get("user_msg") or "")
+        selected = (sample.get("selected") or {}).get("faq_id")
+        if not country or not msg or not selected:
+            continue
+        _bump(state["corpus"], country, msg)
+
+        alternativas = [a for a in (sample.get("alternatives") or []) if a.get("faq_id") != selected]
+        sel_score = (sample.get("selected") or {}).get("score", 0.0)
+        for alt in alternativas:
+            if sel_score - alt.get("score", 0.0) <= CONFUSION_MARGIN:
+                par = "|".join(sorted([selected, alt.get("faq_id")]))
+                _bump(state["confusion"], country, par)
+
+        if sample.get("label") == "negative":
+            rechazados = state["rejected"].setdefault(country, {}).setdefault(selected, [])
+            if msg not in rechazados:
+                rechazados.append(msg)
+            # Si ya se había propuesto para esa FAQ, se descarta
+            state["candidates"].get(country, {}).get(selected, {}).pop(msg, None)
+    return procesados
+
+def _consume_no_context(state: dict, default_country: str) -> int:
+    procesados = 0
+    for entry, offset in iter_jsonl(NOCTX_FILE, state["no_context_offset"]):
+        state["no_context_offset"] = offset
+        procesados += 1
+        if not isinstance(entry, dict):
+            continue
+        country = entry.get("country") or default_country
+        msg = _normalize_text(entry.get("question") or "")
+        if not msg:
+            continue
+        _bump(state["corpus"], country, msg)
+
+        best, faq, second = _top_two(msg, load_faqs_for_country(country) or [])
+        if faq is None or best >= LLM_THRESHOLD:
+            continue
+        faq_id = faq.get("id")
+        if best < CANDIDATE_MIN_SCORE or best - second < CANDIDATE_MIN_MARGIN:
+            continue
+        if msg in state["rejected"].get(country, {}).get(faq_id, []):
+            continue
+        _bump(state["candidates"], country, faq_id, msg)
+    return procesados
+
+# ---------------------------------
+# Propuestas y proyección
+# ---------------------------------
+def build_proposals(state: dict, min_support: int = MIN_SUPPORT) -> Dict[str, Dict[str, dict]]:
+    """{pais: {faq_id: {"keywords": [...], "support": n}}} con keywords aún no presentes."""
+    propuestas: Dict[str, Dict[str, dict]] = {}
+    for country, por_faq in state["candidates"].items():
+        faqs = {f.get("id"): f for f in (load_faqs_for_country(country) or [])}
+        for faq_id, mensajes in por_faq.items():
+            faq = faqs.get(faq_id)
+            if not faq:
+                continue
+            existentes = {_normalize_text(k) for k in faq.get("keywords", [])}
+            nuevas = [m for m, n in sorted(mensajes.items(), key=lambda x: -x[1])
+                      if n >= min_support and m not in existentes]
+            if nuevas:
+                propuestas.setdefault(country, {})[faq_id] = {
+                    "keywords": nuevas,
+                    "support": sum(mensajes[m] for m in nuevas),
+                }
+    return propuestas
+
+def _apply_to_faqs(faqs: List[dict], extra: Dict[str, dict]) -> List[dict]:
+    out = []
+    for faq in faqs:
+        kws = extra.get(faq.get("id"), {}).get("keywords")
+        if kws:
+            faq = dict(faq)
+            faq["keywords"] = list(faq.get("keywords", [])) + kws
+        out.append(faq)
+    return out
+
+def project_llm_rate(state: dict, propuestas: Dict[str, Dict[str, dict]]) -> dict:
+    """Proporción de mensajes del corpus que caerían al LLM antes y después."""
+    total = antes = despues = 0
+    for country, mensajes in state["corpus"].items():
+        faqs = load_faqs_for_country(country) or []
+        faqs_nuevas = _apply_to_faqs(faqs, propuestas.get(country, {}))
+        for msg, n in mensajes.items():
+            total += n
+            if _top_two(msg, faqs)[0] < LLM_THRESHOLD:
+                antes += n
+            if _top_two(msg, faqs_nuevas)[0] < LLM_THRESHOLD:
+                despues += n
+    return {
+        "messages": total,
+        "llm_rate_before": round(antes / total, 4) if total else 0.0,
+        "llm_rate_after": round(despues / total, 4) if total else 0.0,
+    }
+
+def write_overlay(propuestas: Dict[str, Dict[str, dict]]):
+    """Agrega las keywords propuestas al overlay de cada país."""
+    for country, por_faq in propuestas.items():
+        path = DATA_PATH / country / FAQ_OVERLAY_FILE
+        overlay = json.loads(path.read_text(encoding="utf-8")) if path.exists() else {}
+        for faq_id, prop in por_faq.items():
+            actuales = overlay.setdefault(faq_id, {}).setdefault("keywords", [])
+            actuales.extend(k for k in prop["keywords"] if k not in actuales)
+        path.write_text(json.dumps(overlay, ensure_ascii=False, indent=2), encoding="utf-8")
+
+def run(default_country: str = "cr", min_support: int = MIN_SUPPORT, apply: bool = False) -> dict:
+    from services.log_maintenance import migrate_legacy_logs
+    migrate_legacy_logs()
+    # Lock compartido: el mantenimiento no recorta los logs mientras se leen
+    with logs_lock():
+        state = load_state()
+        nuevos_train = _consume_training(state)
+        nuevos_noctx = _consume_no_context(state, default_country)
+        save_state(state)
+
+    propuestas = build_proposals(state, min_support=min_support)
+    proyeccion = project_llm_rate(state, propuestas)
+
+    os.makedirs(LOG_DIR, exist_ok=True)
+    with open(PROPOSALS_FILE, "w", encoding="utf-8") as f:
+        json.dump({
+            "generated_at": datetime.utcnow().isoformat(),
+            "projection": proyeccion,
+            "confusion": state["confusion"],
+            "proposals": propuestas,
+        }, f, ensure_ascii=False, indent=2)
+
+    if apply:
+        write_overlay(propuestas)
+
+    return {
+        "processed_training": nuevos_train,
+        "processed_no_context": nuevos_noctx,
+        "proposals": sum(len(p) for p in propuestas.values()),
+        "applied": apply,
+        **proyeccion,
+    }
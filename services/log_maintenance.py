@@ -0,0 +1,328 @@
+# services/log_maintenance.py (retención y compactación de logs/)
+#
+# Tareas (todas procesan los archivos en streaming y son reanudables):
+#   - compact: agrega no_context_log.jsonl en conteos por pregunta normalizada
+#     y recorta el log crudo a las entradas más recientes.
+#   - rotate:  rota training_data.jsonl a un .jsonl.gz con fecha y conserva
+#     solo los archivos más recientes.
+#   - prune:   deja en last_predictions.jsonl solo la última predicción
+#     vigente de cada usuario.
+#   - index:   genera unanswered_index.json con las preguntas sin respuesta
+#     más frecuentes, para quienes mantienen los datasets.
+# Se ejecuta desde un hilo programado (start_maintenance_thread) o por CLI.
+# Los workers solo agregan líneas; cada reescritura se hace con el lock de
+# logs/ en modo exclusivo (utils/logfiles.py) para no perder ninguna.
+
+import bisect
+import gzip
+import json
+import os
+import shutil
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+
+from config import (
+    LOG_MAINTENANCE_INTERVAL, TRAINING_LOG_MAX_BYTES, TRAINING_ARCHIVES_KEEP,
+    NO_CONTEXT_KEEP_RAW, LAST_PREDICTION_TTL
+)
+from utils.jsonstream import iter_jsonl, iter_json_array, iter_json_object_items
+from utils.logfiles import (
+    LOG_DIR, TRAIN_FILE, NOCTX_FILE, LAST_PRED_FILE, LEGACY_NOCTX_FILE, LEGACY_LAST_PRED_FILE,
+    logs_lock
+)
+from utils.normalization import normalize_text
+
+SUMMARY_FILE = os.path.join(LOG_DIR, "no_context_summary.json")
+UNANSWERED_INDEX_FILE = os.path.join(LOG_DIR, "unanswered_index.json")
+STATE_FILE = os.path.join(LOG_DIR, "maintenance_state.json")
+LOCK_FILE = os.path.join(LOG_DIR, ".maintenance.lock")
+
+UNANSWERED_TOP = 100
+
+# ---------------------------------
+# Estado y exclusión entre procesos
+# ---------------------------------
+def _load_json(path: str, default):
+    if not os.path.exists(path):
+        return default
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return default
+
+def _write_json(path: str, data):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+
+def _try_lock():
+    """Lock de archivo no bloqueante: con varios workers solo uno mantiene los logs."""
+    try:
+        import fcntl
+    except ImportError:
+        return open(LOCK_FILE, "a")
+    f = open(LOCK_FILE, "a")
+    try:
+        fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        f.close()
+        return None
+    return f
+
+def _parse_ts(value) -> Optional[datetime]:
+    try:
+        return datetime.fromisoformat(value) if value else None
+    except (TypeError, ValueError):
+        return None
+
+def _drop_prefix(path: str, offset: int):
+    """Descarta los primeros `offset` bytes. Llamar con logs_lock(exclusive=True)."""
+    tmp = path + ".tmp"
+    with open(path, "rb") as src, open(tmp, "wb") as dst:
+        src.seek(offset)
+        shutil.copyfileobj(src, dst)
+    os.replace(tmp, path)
+
+def _keyword_learning_offset(key: str) -> Optional[int]:
+    """Hasta dónde leyó el aprendizaje de keywords (`key` de su estado), o None si nunca corrió."""
+    from services.keyword_learning import STATE_FILE as KL_STATE_FILE, load_state
+    if not os.path.exists(KL_STATE_FILE):
+        return None
+    return load_state()[key]
+
+# ---------------------------------
+# Migración del formato anterior (JSON completo -> JSONL)
+# ---------------------------------
+def _migrate_no_context() -> int:
+    tmp = NOCTX_FILE + ".tmp"
+    escritos = 0
+    with open(tmp, "wb") as out:
+        for entry, _ in iter_json_array(LEGACY_NOCTX_FILE):
+            out.write((json.dumps(entry, ensure_ascii=False) + "\n").encode("utf-8"))
+            escritos += 1
+        # Lo ya escrito en el formato nuevo es más reciente: va después
+        if os.path.exists(NOCTX_FILE):
+            with open(NOCTX_FILE, "rb") as src:
+                shutil.copyfileobj(src, out)
+    os.replace(tmp, NOCTX_FILE)
+    os.remove(LEGACY_NOCTX_FILE)
+    return escritos
+
+def _migrate_last_predictions() -> int:
+    # El formato viejo ({user_id: pred}) no guardaba hora: se usa la de la
+    # última escritura del archivo, así el TTL las vence como a las demás
+    ts = datetime.utcfromtimestamp(os.path.getmtime(LEGACY_LAST_PRED_FILE)).isoformat()
+    registros = [{"user_id": user_id, "pred": pred, "ts": ts}
+                 for user_id, pred in iter_json_object_items(LEGACY_LAST_PRED_FILE)
+                 if isinstance(pred, dict)]
+    tmp = LAST_PRED_FILE + ".tmp"
+    with open(tmp, "wb") as out:
+        for r in registros:
+            out.write((json.dumps(r, ensure_ascii=False) + "\n").encode("utf-8"))
+        if os.path.exists(LAST_PRED_FILE):
+            with open(LAST_PRED_FILE, "rb") as src:
+                shutil.copyfileobj(src, out)
+    os.replace(tmp, LAST_PRED_FILE)
+    os.remove(LEGACY_LAST_PRED_FILE)
+    return len(registros)
+
+def migrate_legacy_logs() -> dict:
+    """Convierte no_context_log.json y last_predictions.json a JSONL (una sola vez)."""
+    migrados = {}
+    if not (os.path.exists(LEGACY_NOCTX_FILE) or os.path.exists(LEGACY_LAST_PRED_FILE)):
+        return migrados
+    with logs_lock(exclusive=True):
+        if os.path.exists(LEGACY_NOCTX_FILE):
+            migrados["no_context"] = _migrate_no_context()
+        if os.path.exists(LEGACY_LAST_PRED_FILE):
+            migrados["last_predictions"] = _migrate_last_predictions()
+    return migrados
+
+# ---------------------------------
+# Tareas
+# ---------------------------------
+def compact_no_context(keep_raw: int = NO_CONTEXT_KEEP_RAW) -> dict:
+    """Agrega las entradas nuevas al resumen y recorta el log crudo."""
+    state = _load_json(STATE_FILE, {})
+    start = state.get("no_context_offset", 0)
+    if not os.path.exists(NOCTX_FILE) or start > os.path.getsize(NOCTX_FILE):
+        start = 0  # el archivo fue borrado o truncado a mano
+    summary = _load_json(SUMMARY_FILE, {})
+
+    leido = start
+    nuevas = 0
+    fines = []  # offset final de cada registro, para elegir dónde cortar
+    for entry, offset in iter_jsonl(NOCTX_FILE):
+        fines.append(offset)
+        if offset <= start:
+            continue
+        leido = offset
+        if not isinstance(entry, dict):
+            continue
+        pregunta = normalize_text(entry.get("question") or "")
+        if not pregunta:
+            continue
+        country = entry.get("country") or ""
+        key = f"{country}|{pregunta}"
+        item = summary.setdefault(key, {
+            "question": pregunta, "country": country or None, "count": 0,
+            "sample": entry.get("question"), "first_ts": entry.get("ts"), "last_ts": entry.get("ts"),
+        })
+        item["count"] += 1
+        if entry.get("ts"):
+            item["first_ts"] = min(filter(None, [item["first_ts"], entry["ts"]]))
+            item["last_ts"] = max(filter(None, [item["last_ts"], entry["ts"]]))
+        nuevas += 1
+
+    _write_json(SUMMARY_FILE, summary)
+    state["no_context_offset"] = leido
+    _write_json(STATE_FILE, state)
+
+    removidas = corte = 0
+    with logs_lock(exclusive=True):
+        # Se descarta solo lo ya agregado, dejando keep_raw entradas y, si el
+        # aprendizaje de keywords está en uso, nada que todavía no haya leído
+        limite = leido
+        kl_offset = _keyword_learning_offset("no_context_offset")
+        if kl_offset is not None:
+            limite = min(limite, kl_offset)
+        candidatos = fines[:max(0, len(fines) - keep_raw)]
+        removidas = bisect.bisect_right(candidatos, limite)
+        if removidas:
+            corte = candidatos[removidas - 1]
+            _drop_prefix(NOCTX_FILE, corte)
+            state["no_context_offset"] = leido - corte
+            _write_json(STATE_FILE, state)
+            from services.keyword_learning import adjust_offsets
+            adjust_offsets(no_context_removed=corte)
+
+    return {"aggregated": nuevas, "removed": removidas, "distinct_questions": len(summary)}
+
+def rotate_training(max_bytes: int = TRAINING_LOG_MAX_BYTES, keep: int = TRAINING_ARCHIVES_KEEP) -> dict:
+    """Rota training_data.jsonl a gzip si supera max_bytes y poda archivos viejos."""
+    rotated = plain = None
+    deferred = False
+    if os.path.exists(TRAIN_FILE) and os.path.getsize(TRAIN_FILE) > max_bytes:
+        with logs_lock(exclusive=True):
+            # Si el aprendizaje de keywords está en uso y aún no leyó todo el
+            # archivo, se espera a la próxima corrida: rotar perdería esas muestras
+            kl_offset = _keyword_learning_offset("training_offset")
+            if kl_offset is not None and kl_offset < os.path.getsize(TRAIN_FILE):
+                deferred = True
+            else:
+                stamp = datetime.utcnow().strftime("%Y%m%d%H%M%S")
+                plain = os.path.join(LOG_DIR, f"training_data-{stamp}.jsonl")
+                os.replace(TRAIN_FILE, plain)  # los writers abren por ruta en cada muestra
+                from services.keyword_learning import adjust_offsets
+                adjust_offsets(training_rotated=True)
+    if plain:
+        with open(plain, "rb") as src, gzip.open(plain + ".gz", "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        os.remove(plain)
+        rotated = plain + ".gz"
+
+    archivos = sorted(f for f in os.listdir(LOG_DIR)
+                      if f.startswith("training_data-") and f.endswith(".jsonl.gz"))
+    borrados = archivos[:-keep] if keep > 0 else archivos
+    for f in borrados:
+        os.remove(os.path.join(LOG_DIR, f))
+    return {"rotated": rotated, "deferred": deferred,
+            "archives": len(archivos) - len(borrados), "deleted": len(borrados)}
+
+def _latest_predictions(offset: int, ultimas: dict) -> Tuple[int, int]:
+    leidas = 0
+    for record, offset in iter_jsonl(LAST_PRED_FILE, offset):
+        if isinstance(record, dict):
+            ultimas[record.get("user_id")] = record
+            leidas += 1
+    return offset, leidas
+
+def prune_last_predictions(ttl_seconds: int = LAST_PREDICTION_TTL) -> dict:
+    """Reescribe last_predictions.jsonl con la última predicción vigente de cada usuario."""
+    if not os.path.exists(LAST_PRED_FILE):
+        return {"kept": 0, "pruned": 0}
+    limite = datetime.utcnow() - timedelta(seconds=ttl_seconds)
+    ultimas: dict = {}
+    offset, leidas = _latest_predictions(0, ultimas)
+    with logs_lock(exclusive=True):
+        # Lo agregado durante la primera pasada es más reciente: se aplica encima
+        _, extra = _latest_predictions(offset, ultimas)
+        leidas += extra
+        vigentes = []
+        for record in ultimas.values():
+            ts = _parse_ts(record.get("ts"))
+            if record.get("pred") is not None and ts is not None and ts >= limite:
+                vigentes.append((ts, record))
+        # En orden cronológico: get_last_prediction lee desde el final y corta en la primera vencida
+        vigentes.sort(key=lambda x: x[0])
+        tmp = LAST_PRED_FILE + ".tmp"
+        with open(tmp, "wb") as out:
+            for _, record in vigentes:
+                out.write((json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8"))
+        os.replace(tmp, LAST_PRED_FILE)
+    return {"kept": len(vigentes), "pruned": leidas - len(vigentes)}
+
+def build_unanswered_index(top: int = UNANSWERED_TOP) -> dict:
+    summary = _load_json(SUMMARY_FILE, {})
+    items = sorted(summary.values(), key=lambda x: (-x["count"], x["question"]))[:top]
+    _write_json(UNANSWERED_INDEX_FILE, {
+        "generated_at": datetime.utcnow().isoformat(),
+        "questions": [
+            {k: it.get(k) for k in ("question", "country", "count", "sample", "last_ts")}
+            for it in items
+        ],
+    })
+    return {"indexed": len(items)}
+
+TASKS = {
+    "compact": compact_no_context,
+    "rotate": rotate_training,
+    "prune": prune_last_predictions,
+    "index": build_unanswered_index,
+}
+
+def run_maintenance(tasks=None) -> Optional[dict]:
+    """Ejecuta las tareas en orden; None si otro proceso ya las está corriendo."""
+    os.makedirs(LOG_DIR, exist_ok=True)
+    lock = _try_lock()
+    if lock is None:
+        return None
+    resultados = {}
+    try:
+        migrados = migrate_legacy_logs()
+        if migrados:
+            resultados["migrate"] = migrados
+        for name in tasks or list(TASKS):
+            try:
+                resultados[name] = TASKS[name]()
+            except Exception as e:
+                print(f"⚠️ Error en mantenimiento de logs ({name}):", e)
+                resultados[name] = {"error": str(e)}
+    finally:
+        lock.close()
+    return resultados
+
+def start_maintenance_thread(interval: int = LOG_MAINTENANCE_INTERVAL) -> Optional[threading.Thread]:
+    """Hilo daemon que corre el mantenimiento cada `interval` segundos (0 = apagado)."""
+    if not interval:
+        return None
+
+    def _loop():
+        # La migración de formato no espera al primer intervalo
+        try:
+            migrate_legacy_logs()
+        except Exception as e:
+            print("⚠️ Error migrando logs al formato JSONL:", e)
+        while True:
+            time.sleep(interval)
+            resultados = run_maintenance()
+            if resultados:
+                print(f"[info] Mantenimiento de logs: {resultados}")
+
+    t = threading.Thread(target=_loop, name="log-maintenance", daemon=True)
+    t.start()
+    return t
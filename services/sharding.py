@@ -0,0 +1,159 @@
+# services/sharding.py (servicio por shards de país + router delgado)
+#
+# Cada shard es un proceso que atiende un solo país (SHARD_COUNTRY) y mantiene
+# sus propios índices y cachés. El router (SHARD_URLS sin SHARD_COUNTRY)
+# resuelve el país guardado del usuario y reenvía el mensaje al shard; la
+# selección de país ocurre en el router porque aún no hay shard asignado.
+
+import hmac
+import os
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional
+
+from config import SHARD_COUNTRY, SHARD_URLS, SHARD_TIMEOUT, SHARD_SECRET
+from utils.country_selector import (
+    get_user_country, set_user_country_folder, cached_datasets, is_country_folder
+)
+
+LATENCY_WINDOW = 2000  # últimas N latencias por shard
+SHARD_TOKEN_HEADER = "X-Shard-Token"
+
+_latencies: Dict[str, deque] = {}
+_latency_lock = threading.Lock()
+
+def is_router() -> bool:
+    return bool(SHARD_URLS) and not SHARD_COUNTRY
+
+def local_shard_name() -> str:
+    return SHARD_COUNTRY or "all"
+
+def accepts_shard_requests(token: Optional[str]) -> bool:
+    """/chat/shard solo existe en procesos shard y, si hay secreto, con el token correcto."""
+    if not SHARD_COUNTRY:
+        return False
+    return not SHARD_SECRET or hmac.compare_digest(token or "", SHARD_SECRET)
+
+def accepts_stats_request(token: Optional[str]) -> bool:
+    """Reportes internos (pid, memoria, fan-out a shards): solo con SHARD_SECRET y su token."""
+    return bool(SHARD_SECRET) and hmac.compare_digest(token or "", SHARD_SECRET)
+
+def _token_headers() -> Optional[dict]:
+    return {SHARD_TOKEN_HEADER: SHARD_SECRET} if SHARD_SECRET else None
+
+# ---------------------------------
+# Métricas por shard
+# ---------------------------------
+def record_latency(shard: str, seconds: float):
+    with _latency_lock:
+        _latencies.setdefault(shard, deque(maxlen=LATENCY_WINDOW)).append(seconds)
+
+def _percentile(values: list, p: float) -> float:
+    if not values:
+        return 0.0
+    idx = min(len(values) - 1, int(round(p * (len(values) - 1))))
+    return values[idx]
+
+def latency_summary() -> Dict[str, dict]:
+    with _latency_lock:
+        snapshot = {k: sorted(v) for k, v in _latencies.items()}
+    return {
+        shard: {
+            "count": len(vals),
+            "p50_ms": round(_percentile(vals, 0.50) * 1000, 1),
+            "p95_ms": round(_percentile(vals, 0.95) * 1000, 1),
+            "p99_ms": round(_percentile(vals, 0.99) * 1000, 1),
+        }
+        for shard, vals in snapshot.items()
+    }
+
+def memory_mb() -> float:
+    """RSS actual del proceso (Linux) o el máximo visto como respaldo."""
+    try:
+        with open(f"/proc/{os.getpid()}/status", "r") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    try:
+        import resource
+        return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    except Exception:
+        return 0.0
+
+def shard_report() -> dict:
+    return {
+        "shard": local_shard_name(),
+        "pid": os.getpid(),
+        "memory_mb": memory_mb(),
+        "datasets": cached_datasets(),
+        "latency": latency_summary(),
+    }
+
+def collect_shard_reports() -> Dict[str, dict]:
+    """Desde el router: pide el reporte de cada shard configurado."""
+    import requests
+
+    reportes = {"router": shard_report()}
+    for country, url in SHARD_URLS.items():
+        try:
+            r = requests.get(f"{url}/chat/shard/stats", headers=_token_headers(), timeout=5)
+            r.raise_for_status()
+            reportes[country] = r.json()
+        except Exception as e:
+            reportes[country] = {"error": str(e)}
+    return reportes
+
+# ---------------------------------
+# Despacho
+# ---------------------------------
+def _forward(url: str, user_id: str, user_msg: str, channel: str, country: str) -> str:
+    import requests
+
+    r = requests.post(f"{url}/chat/shard", json={
+        "user_id": user_id,
+        "message": user_msg,
+        "channel": channel,
+        "country": country,
+    }, headers=_token_headers(), timeout=SHARD_TIMEOUT)
+    r.raise_for_status()
+    data = r.json()
+    # El shard puede cambiar o borrar el país (p.ej. comando "cambiar país")
+    if data.get("country") != country:
+        set_user_country_folder(user_id, data.get("country"))
+    return data.get("reply", "")
+
+def dispatch_message(user_id: str, user_msg: str, channel: str = 'web') -> str:
+    """Punto de entrada de los blueprints: local o reenviado al shard del país."""
+    from services.chat_service import handle_message
+
+    country = get_user_country(user_id)
+    url = SHARD_URLS.get(country) if is_router() and country else None
+    t0 = time.perf_counter()
+    if url:
+        try:
+            reply = _forward(url, user_id, user_msg, channel, country)
+            record_latency(country, time.perf_counter() - t0)
+            return reply
+        except Exception as e:
+            print(f"⚠️ Shard {country} no disponible, atendiendo localmente: {e}")
+            t0 = time.perf_counter()
+    reply = handle_message(user_id, user_msg, channel=channel)
+    record_latency(local_shard_name(), time.perf_counter() - t0)
+    return reply
+
+def handle_shard_request(user_id: str, user_msg: str, channel: str, country: Optional[str]) -> dict:
+    """Lado shard: adopta el país que envía el router y atiende el mensaje."""
+    from services.chat_service import handle_message
+
+    if not is_country_folder(country):
+        raise ValueError(f"País inválido: {country!r}")
+    if country != SHARD_COUNTRY:
+        print(f"⚠️ Shard {SHARD_COUNTRY} recibió un mensaje de {country}")
+    set_user_country_folder(user_id, country)
+    t0 = time.perf_counter()
+    reply = handle_message(user_id, user_msg, channel=channel)
+    record_latency(local_shard_name(), time.perf_counter() - t0)
+    return {"reply": reply, "country": get_user_country(user_id)}
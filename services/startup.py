@@ -0,0 +1,84 @@
+# services/startup.py (arranque por fases + estado de readiness)
+
+import threading
+import time
+
+from config import AVAILABLE_COUNTRIES
+
+# Marca de inicio del proceso (se toma al importar este módulo desde app.py)
+_T0 = time.perf_counter()
+
+startup_timings = {}   # fase -> segundos desde el arranque
+readiness = {
+    "datasets": False,
+    "model": False,
+}
+_state_lock = threading.Lock()
+
+def mark_phase(name: str):
+    """Registra cuánto tardó el proceso en llegar a la fase indicada."""
+    with _state_lock:
+        startup_timings[name] = round(time.perf_counter() - _T0, 4)
+
+def is_ready() -> bool:
+    return readiness["datasets"]
+
+# ---------------------------------
+# Tareas en segundo plano
+# ---------------------------------
+def precargar_datasets(countries=None):
+    """Carga los JSON de cada país en la caché y precalienta el ranker."""
+    from utils.country_selector import preload_country
+
+    # Importar el servicio de chat aquí evita pagarlo en el arranque del servidor
+    import services.chat_service  # noqa: F401
+    from services.context_builder import rank_faqs_for_country
+
+    # None = todos los países; [] = ninguno (router de shards)
+    folders = list(AVAILABLE_COUNTRIES.values()) if countries is None else countries
+    for folder in folders:
+        try:
+            preload_country(folder)
+            rank_faqs_for_country("hola", folder)  # deja las FAQs pre-renderizadas
+        except Exception as e:
+            print(f"⚠️ Error al precargar datos de {folder}:", e)
+    readiness["datasets"] = True
+    mark_phase("datasets_ready")
+
+def precargar_modelo():
+    """Envía un mensaje corto a Ollama para que cargue el modelo en memoria."""
+    from config import MODEL_NAME
+    try:
+        import ollama
+        print(f"Precargando modelo Ollama: {MODEL_NAME}")
+        ollama.chat(model=MODEL_NAME, messages=[
+            {"role": "user", "content": "Hola"}
+        ])
+        readiness["model"] = True
+        print("✅ Modelo precargado.")
+    except Exception as e:
+        print("⚠️ Error al precargar modelo Ollama:", e)
+    mark_phase("model_ready")
+
+def start_background_warmup(preload_model: bool = True, countries=None):
+    """Lanza la precarga de datasets (y opcionalmente del modelo) sin bloquear."""
+    def _run():
+        precargar_datasets(countries)
+        if preload_model:
+            precargar_modelo()
+        print(startup_report())
+
+    t = threading.Thread(target=_run, name="startup-warmup", daemon=True)
+    t.start()
+    return t
+
+def startup_report() -> str:
+    with _state_lock:
+        fases = sorted(startup_timings.items(), key=lambda x: x[1])
+    lineas = [f"  {nombre}: {segundos * 1000:.0f} ms" for nombre, segundos in fases]
+    return "Tiempos de arranque:\n" + "\n".join(lineas)
+
+def startup_status() -> dict:
+    with _state_lock:
+        timings = dict(startup_timings)
+    return {"ready": is_ready(), "readiness": dict(readiness), "timings": timings}
@@ -0,0 +1,18 @@
+#!/bin/bash
+
+echo "Activando entorno virtual..."
+source env/bin/activate
+
+# Secreto compartido para /chat/shard (se genera uno si no viene definido)
+export SHARD_SECRET="${SHARD_SECRET:-$(head -c 16 /dev/urandom | od -An -tx1 | tr -d ' \n')}"
+
+# Un shard por país: CR recibe la mayor parte del tráfico y escala aparte.
+echo "Iniciando shards por país..."
+SHARD_COUNTRY=cr  gunicorn -w 4 -b 127.0.0.1:5101 app:app --timeout 120 &
+SHARD_COUNTRY=nic gunicorn -w 1 -b 127.0.0.1:5102 app:app --timeout 120 &
+SHARD_COUNTRY=pa  gunicorn -w 1 -b 127.0.0.1:5103 app:app --timeout 120 &
+SHARD_COUNTRY=slv gunicorn -w 1 -b 127.0.0.1:5104 app:app --timeout 120 &
+
+echo "Iniciando router..."
+export SHARD_URLS="cr=http://127.0.0.1:5101,nic=http://127.0.0.1:5102,pa=http://127.0.0.1:5103,slv=http://127.0.0.1:5104"
+gunicorn -w 2 -b 0.0.0.0:5000 app:app --timeout 120
@@ -0,0 +1,36 @@
+# tools/batch_answer.py
+#
+# Responde en lote un JSONL de {"country": "CR", "message": "..."} sin efectos
+# de sesión. Útil para regresión de un faqs.json nuevo o pre-generar respuestas.
+#
+# Uso: python -m tools.batch_answer preguntas.jsonl > respuestas.jsonl
+#      cat preguntas.jsonl | python -m tools.batch_answer --llm --workers 2
+
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from services.batch_service import answer_batch_jsonl, MAX_LLM_WORKERS, BATCH_SIZE
+
+def main():
+    parser = argparse.ArgumentParser(description="Respuestas en lote desde JSONL")
+    parser.add_argument("input", nargs="?", help="Archivo JSONL (por defecto stdin)")
+    parser.add_argument("--llm", action="store_true", help="Usar el LLM cuando el score no alcanza el umbral")
+    parser.add_argument("--workers", type=int, default=MAX_LLM_WORKERS, help="Llamadas concurrentes al LLM")
+    parser.add_argument("--channel", default="web", choices=["web", "meta"])
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    args = parser.parse_args()
+
+    entrada = open(args.input, "r", encoding="utf-8") if args.input else sys.stdin
+    try:
+        for line in answer_batch_jsonl(entrada, use_llm=args.llm, max_workers=args.workers,
+                                       channel=args.channel, batch_size=args.batch_size):
+            sys.stdout.write(line)
+    finally:
+        if args.input:
+            entrada.close()
+
+if __name__ == "__main__":
+    main()
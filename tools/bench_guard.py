@@ -0,0 +1,98 @@
+# tools/bench_guard.py
+#
+# Compara los filtros de salida originales (sanitize_model_output y
+# response_grounded_in_context) con services.guard_engine: verifica que den
+# el mismo resultado y mide el tiempo de cada uno.
+#
+# Uso: python -m tools.bench_guard [--rounds 20]
+
+import argparse
+import json
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from config import DATA_PATH
+from services.guard_engine import (
+    GUARD_ENGINE, BLOCKLIST_SNIPPETS, FORBIDDEN_TERMS,
+    sanitize_model_output_reference, response_grounded_in_context_reference
+)
+
+EXTRA_URLS = ["https://www.coopeande1.com/", "http://example.com/form", "https://bit.ly/xyz)"]
+
+def dataset_answers() -> list:
+    respuestas = []
+    for path in sorted(Path(DATA_PATH).glob("*/faqs.json")):
+        for faq in json.loads(path.read_text(encoding="utf-8")):
+            for r in faq.get("respuestas") or [faq.get("respuesta", "")]:
+                if isinstance(r, str) and r:
+                    respuestas.append(r)
+    return respuestas
+
+def build_cases(seed: int = 7) -> list:
+    """(respuesta del modelo, contexto): respuestas del dataset mezcladas con
+    frases bloqueadas, términos sensibles y URLs dentro y fuera del contexto."""
+    rnd = random.Random(seed)
+    respuestas = dataset_answers()
+    ruido = list(BLOCKLIST_SNIPPETS) + list(FORBIDDEN_TERMS) + EXTRA_URLS + [
+        "No tengo información", "no estoy seguro", "No encontré información", "no recibí respuesta",
+        "Error al contactar con Ollama: timeout", "AUTO", "Tarjeta de Crédito", "autorización",
+    ]
+    casos = []
+    for _ in range(2000):
+        contexto = "\n".join(rnd.sample(respuestas, k=min(3, len(respuestas))))
+        if rnd.random() < 0.3:
+            contexto += " " + rnd.choice(ruido)
+        texto = rnd.choice(respuestas)
+        for _ in range(rnd.randint(0, 2)):
+            texto += " " + rnd.choice(ruido)
+        if rnd.random() < 0.3:
+            texto = texto.upper()
+        casos.append((texto, contexto))
+    casos += [("", ""), ("   ", "x"), ("Visitá https://A.com/x", "ver https://a.com/x")]
+    return casos
+
+def _bench(fn, casos: list, rounds: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(rounds):
+        for texto, contexto in casos:
+            fn(texto, contexto)
+    return time.perf_counter() - t0
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de los filtros de salida del LLM")
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    casos = build_cases()
+    diferencias = []
+    for texto, contexto in casos:
+        if GUARD_ENGINE.sanitize(texto) != sanitize_model_output_reference(texto):
+            diferencias.append(("sanitize", texto))
+        if GUARD_ENGINE.grounded(texto, contexto) != response_grounded_in_context_reference(texto, contexto):
+            diferencias.append(("grounded", texto))
+    if diferencias:
+        print(f"❌ {len(diferencias)} casos con resultado distinto, p.ej.: {diferencias[:3]!r}")
+        sys.exit(1)
+    bloqueados = sum(sanitize_model_output_reference(t)[1] or not response_grounded_in_context_reference(t, c)
+                     for t, c in casos)
+    print(f"✅ Resultado idéntico en {len(casos)} casos ({bloqueados} bloqueados).")
+
+    # Cada caso trae un contexto nuevo, como en producción: todo el costo de
+    # validar contra el contexto queda dentro de la medición
+    tiempos = [
+        ("sanitize referencia", _bench(lambda t, c: sanitize_model_output_reference(t), casos, args.rounds)),
+        ("sanitize motor", _bench(lambda t, c: GUARD_ENGINE.sanitize(t), casos, args.rounds)),
+        ("grounded referencia", _bench(response_grounded_in_context_reference, casos, args.rounds)),
+        ("grounded motor", _bench(GUARD_ENGINE.grounded, casos, args.rounds)),
+    ]
+    print(f"Validaciones: {len(casos) * args.rounds}")
+    for nombre, seg in tiempos:
+        print(f"  {nombre:<30}{seg * 1000:8.1f} ms")
+    print(f"  sanitize x{tiempos[0][1] / tiempos[1][1]:.1f}, grounded x{tiempos[2][1] / tiempos[3][1]:.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+# tools/bench_normalization.py
+#
+# Compara la normalización original con utils.normalization sobre el
+# vocabulario de los datasets y verifica que la salida sea idéntica.
+#
+# Uso: python -m tools.bench_normalization [--rounds 20]
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from config import DATA_PATH
+from utils.normalization import normalize_text, normalize_text_reference
+
+def _collect_strings(value, out: list):
+    if isinstance(value, str):
+        out.append(value)
+    elif isinstance(value, list):
+        for v in value:
+            _collect_strings(v, out)
+    elif isinstance(value, dict):
+        for v in value.values():
+            _collect_strings(v, out)
+
+def dataset_vocabulary() -> list:
+    textos: list = []
+    for path in sorted(Path(DATA_PATH).glob("*/*.json")):
+        _collect_strings(json.loads(path.read_text(encoding="utf-8")), textos)
+    # Casos de borde: mayúsculas, repeticiones, caracteres fuera del rango latino
+    textos += ["HOLAAAA!!!", "¿Dónde está?", "Ñandú  CAFÉ", "İstanbul", "é", "ﬁnanzas", "Ωμέγα;", ""]
+    return textos
+
+def _bench(fn, textos: list, rounds: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(rounds):
+        for t in textos:
+            fn(t)
+    return time.perf_counter() - t0
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de normalización de texto")
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    textos = dataset_vocabulary()
+    diferencias = [t for t in textos if normalize_text(t) != normalize_text_reference(t)]
+    if diferencias:
+        print(f"❌ {len(diferencias)} textos con salida distinta, p.ej.: {diferencias[:3]!r}")
+        sys.exit(1)
+    print(f"✅ Salida idéntica en {len(textos)} textos del dataset.")
+
+    ref = _bench(normalize_text_reference, textos, args.rounds)
+    normalize_text.cache_clear()
+    fria = _bench(normalize_text.__wrapped__, textos, args.rounds)
+    caliente = _bench(normalize_text, textos, args.rounds)
+
+    total = len(textos) * args.rounds
+    print(f"Llamadas: {total}")
+    print(f"  referencia:         {ref * 1000:8.1f} ms")
+    print(f"  translate sin caché:{fria * 1000:8.1f} ms  (x{ref / fria:.1f})")
+    print(f"  translate + caché:  {caliente * 1000:8.1f} ms  (x{ref / caliente:.1f})")
+
+if __name__ == "__main__":
+    main()
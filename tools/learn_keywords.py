@@ -0,0 +1,36 @@
+# tools/learn_keywords.py
+#
+# Job offline e incremental: procesa los logs nuevos desde la última corrida,
+# escribe logs/keyword_proposals.json para revisión y reporta el cambio
+# proyectado en la tasa de llamadas al LLM.
+#
+# Uso: python -m tools.learn_keywords [--country cr] [--min-support 2] [--apply]
+
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from services.keyword_learning import run, MIN_SUPPORT, PROPOSALS_FILE
+
+def main():
+    parser = argparse.ArgumentParser(description="Aprendizaje incremental de keywords por FAQ")
+    parser.add_argument("--country", default="cr",
+                        help="Carpeta de país para entradas de no_context_log sin país")
+    parser.add_argument("--min-support", type=int, default=MIN_SUPPORT)
+    parser.add_argument("--apply", action="store_true",
+                        help="Escribe las propuestas en data/<pais>/faqs_overlay.json")
+    args = parser.parse_args()
+
+    r = run(default_country=args.country, min_support=args.min_support, apply=args.apply)
+    print(f"Registros nuevos: {r['processed_training']} de entrenamiento, "
+          f"{r['processed_no_context']} sin contexto")
+    print(f"FAQs con keywords propuestas: {r['proposals']} (detalle en {PROPOSALS_FILE})")
+    print(f"Tasa de llamadas al LLM proyectada: {r['llm_rate_before']:.1%} -> "
+          f"{r['llm_rate_after']:.1%} sobre {r['messages']} mensajes")
+    if r["applied"]:
+        print("✅ Overlay actualizado.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+# tools/loadtest/driver.py
+#
+# Simula N usuarios de Messenger (POST /webhook/ con payload de página) y M
+# usuarios web (POST /chat/) contra un servidor en marcha. Reporta
+# throughput, latencias p50/p95/p99, tasa de errores y la memoria del
+# servidor a lo largo del tiempo (vía /chat/shard/stats, que exige el
+# SHARD_SECRET del servidor; sin él la columna de memoria queda vacía).
+#
+# Uso:
+#   SHARD_SECRET=... python -m tools.loadtest.driver --target http://127.0.0.1:5001 \
+#       --messenger-users 50 --web-users 50 --duration 60
+
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent))
+
+from config import DATA_PATH
+
+EXTRA_MESSAGES = [
+    "hola", "gracias", "buenas tardes", "donde queda la sucursal",
+    "horario de san jose", "quiero un credito para un carro", "chao",
+]
+
+def question_pool() -> list:
+    """Preguntas y keywords del dataset más cortesías y consultas de ubicación."""
+    pool = list(EXTRA_MESSAGES)
+    for path in Path(DATA_PATH).glob("*/faqs.json"):
+        for faq in json.loads(path.read_text(encoding="utf-8")):
+            if faq.get("pregunta"):
+                pool.append(faq["pregunta"].lower())
+            pool.extend(k.lower() for k in faq.get("keywords", [])[:3])
+    return pool
+
+class Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = {"messenger": [], "web": []}
+        self.errors = {"messenger": 0, "web": 0}
+        self.memory = []  # (segundos, MB)
+
+    def add(self, kind: str, seconds: float, ok: bool):
+        with self.lock:
+            self.latencies[kind].append(seconds)
+            if not ok:
+                self.errors[kind] += 1
+
+def _post(url: str, body: dict, timeout: float) -> bool:
+    req = urllib.request.Request(url, data=json.dumps(body).encode("utf-8"),
+                                 headers={"Content-Type": "application/json"}, method="POST")
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as r:
+            r.read()
+            return 200 <= r.status < 300
+    except (urllib.error.URLError, OSError):
+        return False
+
+def _user_loop(kind: str, n: int, args, pool: list, rec: Recorder, deadline: float):
+    rnd = random.Random(n)
+    user_id = f"lt-{kind}-{n}"
+    # Primer mensaje: selección de país
+    mensajes = [rnd.choice(["1", "4"])]
+    while time.time() < deadline:
+        msg = mensajes.pop() if mensajes else rnd.choice(pool)
+        if kind == "messenger":
+            url = f"{args.target}/webhook/"
+            body = {"object": "page", "entry": [{"messaging": [
+                {"sender": {"id": user_id}, "message": {"text": msg}}
+            ]}]}
+        else:
+            url = f"{args.target}/chat/"
+            body = {"user_id": user_id, "message": msg}
+        t0 = time.perf_counter()
+        ok = _post(url, body, args.timeout)
+        rec.add(kind, time.perf_counter() - t0, ok)
+        time.sleep(rnd.uniform(0, args.think_time))
+
+def _memory_sampler(args, rec: Recorder, start: float, stop: threading.Event):
+    req = urllib.request.Request(f"{args.target}/chat/shard/stats",
+                                 headers={"X-Shard-Token": os.environ.get("SHARD_SECRET", "")})
+    while not stop.wait(args.sample_every):
+        try:
+            with urllib.request.urlopen(req, timeout=5) as r:
+                mb = json.loads(r.read().decode("utf-8")).get("memory_mb", 0.0)
+        except (urllib.error.URLError, OSError, ValueError):
+            mb = None
+        with rec.lock:
+            rec.memory.append((round(time.time() - start, 1), mb))
+
+def _pct(values: list, p: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p * (len(values) - 1))))] * 1000
+
+def report(rec: Recorder, elapsed: float) -> str:
+    lineas = [f"Duración: {elapsed:.1f} s"]
+    for kind, lat in rec.latencies.items():
+        if not lat:
+            continue
+        err = rec.errors[kind]
+        lineas.append(
+            f"{kind:>9}: {len(lat)} req, {len(lat) / elapsed:.1f} req/s, "
+            f"p50 {_pct(lat, .5):.0f} ms, p95 {_pct(lat, .95):.0f} ms, p99 {_pct(lat, .99):.0f} ms, "
+            f"errores {err / len(lat):.1%}"
+        )
+    muestras = [(t, mb) for t, mb in rec.memory if mb is not None]
+    if muestras:
+        lineas.append("Memoria del servidor (s -> MB): " + ", ".join(f"{t}->{mb}" for t, mb in muestras))
+        lineas.append(f"Crecimiento de memoria: {muestras[-1][1] - muestras[0][1]:+.1f} MB")
+    return "\n".join(lineas)
+
+def main():
+    parser = argparse.ArgumentParser(description="Driver de carga para /webhook/ y /chat/")
+    parser.add_argument("--target", default="http://127.0.0.1:5001")
+    parser.add_argument("--messenger-users", type=int, default=20)
+    parser.add_argument("--web-users", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=30.0, help="Segundos")
+    parser.add_argument("--think-time", type=float, default=1.0, help="Pausa máxima entre mensajes")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--sample-every", type=float, default=5.0, help="Segundos entre muestras de memoria")
+    args = parser.parse_args()
+    args.target = args.target.rstrip("/")
+
+    pool = question_pool()
+    rec = Recorder()
+    start = time.time()
+    deadline = start + args.duration
+    stop = threading.Event()
+
+    hilos = [threading.Thread(target=_user_loop, args=("messenger", n, args, pool, rec, deadline))
+             for n in range(args.messenger_users)]
+    hilos += [threading.Thread(target=_user_loop, args=("web", n, args, pool, rec, deadline))
+              for n in range(args.web_users)]
+    sampler = threading.Thread(target=_memory_sampler, args=(args, rec, start, stop), daemon=True)
+    sampler.start()
+    for t in hilos:
+        t.start()
+    for t in hilos:
+        t.join()
+    stop.set()
+    print(report(rec, time.time() - start))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+# tools/loadtest/stubs.py
+#
+# Servidores locales que reemplazan a Ollama (/api/chat) y a la Graph API
+# (/me/messages) durante las pruebas de carga. Latencia, jitter, streaming y
+# tasa de errores son configurables.
+#
+# Uso:
+#   python -m tools.loadtest.stubs --ollama-port 11500 --graph-port 11600 \
+#       --ollama-latency 0.8 --ollama-jitter 0.3 --graph-latency 0.05
+#   OLLAMA_URL=http://127.0.0.1:11500/api/chat \
+#   GRAPH_API_URL=http://127.0.0.1:11600/v19.0 python app.py
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_REPLY = "Podés consultar los requisitos en el formulario de solicitud."
+
+class _Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+
+    def hit(self, error: bool = False):
+        with self.lock:
+            self.requests += 1
+            if error:
+                self.errors += 1
+
+    def as_dict(self) -> dict:
+        with self.lock:
+            return {"requests": self.requests, "errors": self.errors}
+
+class _StubHandler(BaseHTTPRequestHandler):
+    server_version = "LoadTestStub/1.0"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass  # silencioso: miles de requests por segundo
+
+    def _read_json(self) -> dict:
+        length = int(self.headers.get("Content-Length") or 0)
+        if not length:
+            return {}
+        try:
+            return json.loads(self.rfile.read(length).decode("utf-8"))
+        except ValueError:
+            return {}
+
+    def _send_json(self, status: int, body: dict):
+        raw = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(raw)))
+        self.end_headers()
+        self.wfile.write(raw)
+
+    def _sleep(self):
+        cfg = self.server.cfg
+        time.sleep(max(0.0, cfg["latency"] + random.uniform(-cfg["jitter"], cfg["jitter"])))
+
+    def _should_fail(self) -> bool:
+        return random.random() < self.server.cfg["error_rate"]
+
+    def do_GET(self):
+        if self.path.rstrip("/") == "/stats":
+            self._send_json(200, self.server.stats.as_dict())
+        else:
+            self._send_json(404, {"error": "not found"})
+
+def _reply_from_context(messages: list, fallback: str) -> str:
+    """Devuelve la primera línea de FAQ del contexto, para pasar el grounding."""
+    for m in messages:
+        content = m.get("content", "") if m.get("role") == "system" else ""
+        if "FAQs relevantes:" in content:
+            lines = content.split("FAQs relevantes:", 1)[1].strip().splitlines()
+            if lines:
+                return lines[0]
+    return fallback
+
+class OllamaStubHandler(_StubHandler):
+    def do_POST(self):
+        if not self.path.startswith("/api/chat"):
+            self._send_json(404, {"error": "not found"})
+            return
+        payload = self._read_json()
+        self._sleep()
+        if self._should_fail():
+            self.server.stats.hit(error=True)
+            self._send_json(500, {"error": "stub error"})
+            return
+        self.server.stats.hit()
+
+        model = payload.get("model", "stub")
+        content = _reply_from_context(payload.get("messages", []), self.server.cfg["reply"])
+        if not payload.get("stream"):
+            self._send_json(200, {
+                "model": model,
+                "message": {"role": "assistant", "content": content},
+                "done": True,
+            })
+            return
+
+        # Streaming NDJSON como Ollama: un objeto por palabra y uno final con done=true
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        words = content.split(" ")
+        for i, word in enumerate(words):
+            piece = word if i == 0 else " " + word
+            self._write_chunk({"model": model, "message": {"role": "assistant", "content": piece}, "done": False})
+            time.sleep(self.server.cfg["chunk_delay"])
+        self._write_chunk({"model": model, "message": {"role": "assistant", "content": ""}, "done": True})
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _write_chunk(self, obj: dict):
+        raw = (json.dumps(obj, ensure_ascii=False) + "\n").encode("utf-8")
+        self.wfile.write(f"{len(raw):x}\r\n".encode("ascii") + raw + b"\r\n")
+        self.wfile.flush()
+
+class GraphStubHandler(_StubHandler):
+    def do_POST(self):
+        if "/me/messages" not in self.path:
+            self._send_json(404, {"error": "not found"})
+            return
+        payload = self._read_json()
+        self._sleep()
+        if self._should_fail():
+            self.server.stats.hit(error=True)
+            self._send_json(500, {"error": {"message": "stub error", "code": 2}})
+            return
+        self.server.stats.hit()
+        recipient = (payload.get("recipient") or {}).get("id", "")
+        self._send_json(200, {"recipient_id": recipient, "message_id": f"m_{time.time_ns()}"})
+
+def make_server(handler, port: int, latency: float = 0.0, jitter: float = 0.0,
+                error_rate: float = 0.0, chunk_delay: float = 0.02,
+                reply: str = DEFAULT_REPLY) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    server.cfg = {
+        "latency": latency, "jitter": jitter, "error_rate": error_rate,
+        "chunk_delay": chunk_delay, "reply": reply,
+    }
+    server.stats = _Stats()
+    return server
+
+def serve_in_background(server: ThreadingHTTPServer) -> threading.Thread:
+    t = threading.Thread(target=server.serve_forever, daemon=True)
+    t.start()
+    return t
+
+def main():
+    parser = argparse.ArgumentParser(description="Stubs de Ollama y Graph API para pruebas de carga")
+    parser.add_argument("--ollama-port", type=int, default=11500)
+    parser.add_argument("--ollama-latency", type=float, default=0.8, help="Segundos por respuesta")
+    parser.add_argument("--ollama-jitter", type=float, default=0.2)
+    parser.add_argument("--ollama-errors", type=float, default=0.0, help="Proporción de respuestas 500")
+    parser.add_argument("--chunk-delay", type=float, default=0.02, help="Segundos entre chunks en streaming")
+    parser.add_argument("--reply", default=DEFAULT_REPLY, help="Respuesta si el contexto no trae FAQs")
+    parser.add_argument("--graph-port", type=int, default=11600)
+    parser.add_argument("--graph-latency", type=float, default=0.05)
+    parser.add_argument("--graph-jitter", type=float, default=0.02)
+    parser.add_argument("--graph-errors", type=float, default=0.0)
+    args = parser.parse_args()
+
+    ollama = make_server(OllamaStubHandler, args.ollama_port, args.ollama_latency,
+                         args.ollama_jitter, args.ollama_errors, args.chunk_delay, args.reply)
+    graph = make_server(GraphStubHandler, args.graph_port, args.graph_latency,
+                        args.graph_jitter, args.graph_errors)
+    serve_in_background(ollama)
+    serve_in_background(graph)
+    print(f"Ollama stub: http://127.0.0.1:{args.ollama_port}/api/chat")
+    print(f"Graph stub:  http://127.0.0.1:{args.graph_port}/v19.0/me/messages")
+    try:
+        while True:
+            time.sleep(10)
+            print(f"ollama={ollama.stats.as_dict()} graph={graph.stats.as_dict()}")
+    except KeyboardInterrupt:
+        ollama.shutdown()
+        graph.shutdown()
+
+if __name__ == "__main__":
+    main()
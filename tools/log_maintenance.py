@@ -0,0 +1,30 @@
+# tools/log_maintenance.py
+#
+# Ejecuta a mano el mantenimiento de logs/ (el servidor lo corre también en
+# un hilo programado). Es reanudable: cada tarea continúa donde quedó.
+#
+# Uso: python -m tools.log_maintenance [--task compact --task index]
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from services.log_maintenance import run_maintenance, TASKS
+
+def main():
+    parser = argparse.ArgumentParser(description="Compactación y retención de logs/")
+    parser.add_argument("--task", action="append", choices=list(TASKS),
+                        help="Tarea a ejecutar (repetible); por defecto todas")
+    args = parser.parse_args()
+
+    resultados = run_maintenance(args.task)
+    if resultados is None:
+        print("Otro proceso está ejecutando el mantenimiento; intentá más tarde.")
+        sys.exit(1)
+    print(json.dumps(resultados, ensure_ascii=False, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+# tools/stress_history.py
+#
+# Prueba de estrés de services/history_manager: cientos de usuarios, cada
+# uno con varios hilos escritores que intercalan historial y contexto,
+# mientras otros hilos leen. Verifica que cada usuario termine con el número
+# exacto de turnos (sin actualizaciones perdidas) y reporta la contención
+# por franja de lock.
+#
+# Uso: python -m tools.stress_history [--users 300] [--writers 4] [--turns 50] [--readers 8]
+
+import argparse
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from services import history_manager as hm
+
+class _YieldingDict(dict):
+    """Cede el GIL justo después de cada lectura: abre la ventana entre leer y
+    reescribir el historial, así sin lock se pierden turnos de forma segura."""
+    def get(self, key, default=None):
+        value = super().get(key, default)
+        time.sleep(0)
+        return value
+
+def _writer(user_id: str, writer: int, turns: int, barrier: threading.Barrier):
+    barrier.wait()
+    for i in range(turns):
+        hm.update_history(user_id, f"msg {writer}-{i}", f"resp {writer}-{i}")
+        hm.refresh_context(user_id, f"contexto {user_id} {writer}-{i}")
+
+def _reader(user_ids: list, stop: threading.Event, errores: list):
+    while not stop.is_set():
+        for uid in user_ids:
+            history, _ = hm.get_user_history(uid)
+            # Una instantánea siempre tiene pares completos usuario/asistente
+            if len(history) % 2:
+                errores.append(f"historial impar para {uid}")
+            ctx = hm.get_context(uid)
+            if ctx and not ctx.startswith(f"contexto {uid} "):
+                errores.append(f"contexto ajeno para {uid}")
+        time.sleep(0.001)
+
+def main():
+    parser = argparse.ArgumentParser(description="Estrés de history_manager")
+    parser.add_argument("--users", type=int, default=300)
+    parser.add_argument("--writers", type=int, default=4, help="escritores concurrentes por usuario")
+    parser.add_argument("--turns", type=int, default=50)
+    parser.add_argument("--readers", type=int, default=8)
+    args = parser.parse_args()
+
+    hm.clear_all_histories()
+    hm.conversation_history = _YieldingDict()
+    user_ids = [f"stress-{n}" for n in range(args.users)]
+    barrier = threading.Barrier(args.users * args.writers)
+    stop = threading.Event()
+    errores: list = []
+
+    writers = [threading.Thread(target=_writer, args=(uid, w, args.turns, barrier))
+               for uid in user_ids for w in range(args.writers)]
+    readers = [threading.Thread(target=_reader, args=(user_ids, stop, errores)) for _ in range(args.readers)]
+
+    t0 = time.perf_counter()
+    for t in readers + writers:
+        t.start()
+    for t in writers:
+        t.join()
+    elapsed = time.perf_counter() - t0
+    stop.set()
+    for t in readers:
+        t.join()
+
+    esperados = sorted(f"msg {w}-{i}" for w in range(args.writers) for i in range(args.turns))
+    perdidas = []
+    for uid in user_ids:
+        history = hm.get_user_history(uid)[0]
+        recibidos = sorted(m["content"] for m in history if m["role"] == "user")
+        # El contexto final es el último turno de alguno de los escritores
+        finales = {f"contexto {uid} {w}-{args.turns - 1}" for w in range(args.writers)}
+        if (len(history) != 2 * args.writers * args.turns or recibidos != esperados
+                or hm.get_context(uid) not in finales):
+            perdidas.append(uid)
+    stats = hm.lock_contention()
+    ops = args.users * args.writers * args.turns * 2
+
+    print(f"Operaciones de escritura: {ops} en {elapsed:.2f} s ({ops / elapsed:,.0f} ops/s)")
+    print(f"Usuarios con actualizaciones perdidas: {len(perdidas)}")
+    print(f"Inconsistencias vistas por lectores: {len(errores)}")
+    print(f"Esperas por lock: total {stats['total']}, máximo en una franja "
+          f"{max(stats['waits'])}, promedio {stats['total'] / stats['stripes']:.1f}")
+    if perdidas or errores:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
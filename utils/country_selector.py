@@ -1,11 +1,19 @@
 # utils/country_selector.py
 
 import json
+import threading
 from pathlib import Path
 from config import AVAILABLE_COUNTRIES, DATA_PATH
 
 user_country_map = {}
 
+# Cache de datasets por (carpeta_pais, archivo) -> (mtime, datos).
+# Se invalida solo cuando el archivo cambia en disco.
+_dataset_cache = {}
+_dataset_lock = threading.Lock()
+
+DATASET_FILES = ('faqs.json', 'direcciones.json', 'horarios.json')
+
 def set_user_country(user_id: str, country_code: str):
     if country_code in AVAILABLE_COUNTRIES:
         user_country_map[user_id] = AVAILABLE_COUNTRIES[country_code]
@@ -15,23 +23,75 @@ def set_user_country(user_id: str, country_code: str):
 def get_user_country(user_id: str) -> str:
     return user_country_map.get(user_id)
 
-def load_horarios(user_id: str):
-    country_folder = get_user_country(user_id)
+def is_country_folder(country_folder) -> bool:
+    return country_folder in AVAILABLE_COUNTRIES.values()
+
+def set_user_country_folder(user_id: str, country_folder: str):
+    """Fija la carpeta de país directamente (o la borra si es vacía)."""
     if not country_folder:
-        return []
-    file_path = DATA_PATH / country_folder / 'horarios.json'
-    return json.loads(file_path.read_text(encoding='utf-8')) if file_path.exists() else []
+        user_country_map.pop(user_id, None)
+        return True
+    if is_country_folder(country_folder):
+        user_country_map[user_id] = country_folder
+        return True
+    return False
 
-def load_direcciones(user_id: str):
-    country_folder = get_user_country(user_id)
+def cached_datasets():
+    """Archivos cargados en caché como 'pais/archivo'."""
+    return sorted(f"{c}/{f}" for c, f in _dataset_cache)
+
+def load_dataset(country_folder: str, filename: str):
+    """Carga un JSON del país usando la caché; recarga si cambió el mtime."""
     if not country_folder:
         return []
-    file_path = DATA_PATH / country_folder / 'direcciones.json'
-    return json.loads(file_path.read_text(encoding='utf-8')) if file_path.exists() else []
+    file_path = DATA_PATH / country_folder / filename
+    try:
+        mtime = file_path.stat().st_mtime
+    except OSError:
+        return []
+    key = (country_folder, filename)
+    cached = _dataset_cache.get(key)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    with _dataset_lock:
+        cached = _dataset_cache.get(key)
+        if cached and cached[0] == mtime:
+            return cached[1]
+        data = json.loads(file_path.read_text(encoding='utf-8'))
+        _dataset_cache[key] = (mtime, data)
+        return data
+
+def preload_country(country_folder: str) -> int:
+    """Precarga todos los datasets de un país. Retorna cuántos archivos cargó."""
+    loaded = 0
+    for filename in DATASET_FILES:
+        if (DATA_PATH / country_folder / filename).exists():
+            load_dataset(country_folder, filename)
+            loaded += 1
+    return loaded
 
 def load_faqs(user_id: str):
-    country_folder = get_user_country(user_id)
-    if not country_folder:
-        return []
-    file_path = DATA_PATH / country_folder / 'faqs.json'
-    return json.loads(file_path.read_text(encoding='utf-8')) if file_path.exists() else []
+    return load_faqs_for_country(get_user_country(user_id))
+
+# Overlay de keywords aprendidas (services/keyword_learning.py):
+# {"faq_id": {"keywords": [...]}} en data/<pais>/faqs_overlay.json
+FAQ_OVERLAY_FILE = 'faqs_overlay.json'
+_overlay_cache = {}  # carpeta -> (faqs_base, overlay, faqs_combinadas)
+
+def load_faqs_for_country(country_folder: str):
+    faqs = load_dataset(country_folder, 'faqs.json')
+    overlay = load_dataset(country_folder, FAQ_OVERLAY_FILE)
+    if not overlay or not isinstance(faqs, list) or not isinstance(overlay, dict):
+        return faqs
+    cached = _overlay_cache.get(country_folder)
+    if cached and cached[0] is faqs and cached[1] is overlay:
+        return cached[2]
+    merged = []
+    for faq in faqs:
+        extra = overlay.get(faq.get("id"), {}).get("keywords", [])
+        if extra:
+            faq = dict(faq)
+            faq["keywords"] = list(faq.get("keywords", [])) + [k for k in extra if k not in faq.get("keywords", [])]
+        merged.append(faq)
+    _overlay_cache[country_folder] = (faqs, overlay, merged)
+    return merged
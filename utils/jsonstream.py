@@ -0,0 +1,142 @@
+# utils/jsonstream.py (lectura incremental de JSONL y arreglos JSON)
+
+import json
+import os
+from typing import Any, Iterator, Tuple
+
+_CHUNK_SIZE = 64 * 1024
+_decoder = json.JSONDecoder()
+
+def iter_jsonl(path: str, offset: int = 0) -> Iterator[Tuple[Any, int]]:
+    """
+    Recorre un .jsonl desde `offset` (bytes). Devuelve (registro, offset_siguiente)
+    para poder reanudar. Las líneas inválidas se saltan; una última línea sin
+    salto de línea (escritura en curso) no se consume.
+    """
+    if not os.path.exists(path):
+        return
+    if offset > os.path.getsize(path):
+        offset = 0  # el archivo fue rotado o truncado
+    with open(path, "rb") as f:
+        f.seek(offset)
+        for raw in f:
+            if not raw.endswith(b"\n"):
+                break
+            offset += len(raw)
+            line = raw.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line.decode("utf-8")), offset
+            except (ValueError, UnicodeDecodeError):
+                continue
+
+def iter_jsonl_reverse(path: str) -> Iterator[Any]:
+    """
+    Recorre un .jsonl desde el final (registros más recientes primero) leyendo
+    por bloques. Una última línea sin salto de línea (escritura en curso) se omite.
+    """
+    if not os.path.exists(path):
+        return
+    with open(path, "rb") as f:
+        pos = f.seek(0, os.SEEK_END)
+        resto = b""   # inicio de línea que sigue en el bloque anterior
+        cola = True   # hasta el último "\n" del archivo todo es una línea incompleta
+        while pos > 0:
+            paso = min(_CHUNK_SIZE, pos)
+            pos -= paso
+            f.seek(pos)
+            lineas = (f.read(paso) + resto).split(b"\n")
+            resto = lineas.pop(0)
+            if cola:
+                if not lineas:
+                    continue
+                lineas.pop()
+                cola = False
+            for raw in reversed(lineas):
+                record = _parse_line(raw)
+                if record is not None:
+                    yield record
+        if resto and not cola:
+            record = _parse_line(resto)
+            if record is not None:
+                yield record
+
+def _parse_line(raw: bytes) -> Any:
+    raw = raw.strip()
+    if not raw:
+        return None
+    try:
+        return json.loads(raw.decode("utf-8"))
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+def _iter_json_container(path: str, opener: str) -> Iterator[Tuple[Any, int]]:
+    with open(path, "r", encoding="utf-8") as f:
+        buf = ""
+        pos = 0
+        eof = False
+
+        def _fill():
+            nonlocal buf, pos, eof
+            chunk = f.read(_CHUNK_SIZE)
+            if not chunk:
+                eof = True
+            buf = buf[pos:] + chunk
+            pos = 0
+
+        def _skip_ws():
+            nonlocal pos
+            while True:
+                while pos < len(buf) and buf[pos] in " \t\r\n,:":
+                    pos += 1
+                if pos < len(buf) or eof:
+                    return
+                _fill()
+
+        _fill()
+        _skip_ws()
+        if pos >= len(buf) or buf[pos] != opener:
+            return
+        pos += 1
+        index = 0
+        while True:
+            _skip_ws()
+            if pos >= len(buf) or buf[pos] in "]}":
+                return
+            while True:
+                try:
+                    value, end = _decoder.raw_decode(buf, pos)
+                    # Un número podría estar cortado al final del bloque
+                    if end == len(buf) and not eof:
+                        raise ValueError("fin de bloque")
+                    break
+                except ValueError:
+                    if eof:
+                        return
+                    _fill()
+            pos = end
+            yield value, index
+            index += 1
+
+def iter_json_array(path: str, skip: int = 0) -> Iterator[Tuple[Any, int]]:
+    """
+    Recorre un arreglo JSON elemento por elemento sin cargarlo completo.
+    Devuelve (elemento, índice); `skip` omite los primeros elementos.
+    """
+    if not os.path.exists(path):
+        return
+    for value, index in _iter_json_container(path, "["):
+        if index >= skip:
+            yield value, index
+
+def iter_json_object_items(path: str) -> Iterator[Tuple[str, Any]]:
+    """Recorre un objeto JSON como pares (clave, valor) sin cargarlo completo."""
+    if not os.path.exists(path):
+        return
+    key = None
+    for value, index in _iter_json_container(path, "{"):
+        if index % 2 == 0:
+            key = value
+        else:
+            yield key, value
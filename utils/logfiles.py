@@ -0,0 +1,47 @@
+# utils/logfiles.py (rutas de logs/ y escritura concurrente segura)
+#
+# Los workers solo agregan líneas JSONL, con el lock de logs/ en modo
+# compartido: varios appends pueden ir a la vez. El mantenimiento toma el
+# mismo lock en modo exclusivo para reescribir un archivo (recortar, rotar,
+# compactar), así ninguna línea escrita mientras tanto se pierde.
+
+import json
+import os
+from contextlib import contextmanager
+
+LOG_DIR = "logs"
+TRAIN_FILE = os.path.join(LOG_DIR, "training_data.jsonl")      # para mejorar keywords/intenciones
+LAST_PRED_FILE = os.path.join(LOG_DIR, "last_predictions.jsonl")  # estado por usuario (append-only)
+NOCTX_FILE = os.path.join(LOG_DIR, "no_context_log.jsonl")
+LOCK_FILE = os.path.join(LOG_DIR, ".logs.lock")
+
+# Formato anterior (JSON completo reescrito en cada mensaje); ver log_maintenance
+LEGACY_LAST_PRED_FILE = os.path.join(LOG_DIR, "last_predictions.json")
+LEGACY_NOCTX_FILE = os.path.join(LOG_DIR, "no_context_log.json")
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin lock entre procesos
+    fcntl = None
+
+@contextmanager
+def logs_lock(exclusive: bool = False):
+    os.makedirs(LOG_DIR, exist_ok=True)
+    with open(LOCK_FILE, "a") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+def append_jsonl(path: str, record: dict):
+    """Agrega un registro en una sola escritura O_APPEND (no se intercala con otros workers)."""
+    raw = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+    with logs_lock():
+        fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, raw)
+        finally:
+            os.close(fd)
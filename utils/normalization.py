@@ -0,0 +1,71 @@
+# utils/normalization.py (normalización de texto con caché y tabla de traducción)
+
+import re
+import sys
+import unicodedata
+from functools import lru_cache
+
+_PUNC_RE = re.compile(r"[!¡.,;:?¿\-\(\)\[\]\{\}<>\"'`/\\]")
+_REPEAT_RE = re.compile(r"(.)\1{2,}")
+_SPACES_RE = re.compile(r"\s+")
+
+# Rango cubierto por la tabla: ASCII, Latin-1 y Latin Extended-A/B.
+# Fuera de ese rango se usa la ruta original con unicodedata.
+_TABLE_LIMIT = 0x250
+
+NORMALIZE_CACHE_SIZE = 8192
+
+def normalize_text_reference(text: str) -> str:
+    """Implementación original (NFD + filtro por carácter). Sirve de referencia."""
+    if not text:
+        return ""
+    text = text.lower()
+    text = ''.join(c for c in unicodedata.normalize('NFD', text)
+                   if unicodedata.category(c) != 'Mn')
+    text = _PUNC_RE.sub(" ", text)
+    text = _REPEAT_RE.sub(r"\1", text)  # holaaa -> hola
+    text = _SPACES_RE.sub(" ", text).strip()
+    return text
+
+def _build_table() -> dict:
+    """
+    Tabla para str.translate: quita acentos (parte Mn de la descomposición NFD)
+    y reemplaza puntuación por espacio. Solo incluye caracteres cuya
+    descomposición no tiene marcas que NFD pudiera reordenar.
+    """
+    table = {}
+    for cp in range(_TABLE_LIMIT):
+        ch = chr(cp)
+        decomposed = unicodedata.normalize('NFD', ch)
+        kept = [c for c in decomposed if unicodedata.category(c) != 'Mn']
+        if any(unicodedata.combining(c) for c in kept):
+            continue
+        mapped = _PUNC_RE.sub(" ", ''.join(kept))
+        if mapped != ch:
+            table[cp] = mapped
+    return table
+
+_TABLE = _build_table()
+_TABLE_MAX_CHAR = chr(_TABLE_LIMIT)
+
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def normalize_text(text: str) -> str:
+    """
+    Igual a normalize_text_reference, byte a byte, pero con str.translate
+    para el rango latino y memoizado (resultado internado).
+    """
+    if not text:
+        return ""
+    text = text.lower()
+    if max(text) < _TABLE_MAX_CHAR:
+        text = text.translate(_TABLE)
+    else:
+        text = ''.join(c for c in unicodedata.normalize('NFD', text)
+                       if unicodedata.category(c) != 'Mn')
+        text = _PUNC_RE.sub(" ", text)
+    text = _REPEAT_RE.sub(r"\1", text)
+    text = _SPACES_RE.sub(" ", text).strip()
+    return sys.intern(text)
+
+def cache_info():
+    return normalize_text.cache_info()
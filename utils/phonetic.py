@@ -0,0 +1,56 @@
+# utils/phonetic.py (clave fonética simple para español)
+#
+# Pliega las grafías que suenan igual en español latinoamericano para que
+# variantes como "iglezia", "katolika" o "zarcaz" den la misma clave que la
+# palabra correcta. Espera texto ya normalizado (minúsculas, sin tildes).
+
+import re
+from functools import lru_cache
+from typing import Dict, Iterable, List, Set, Tuple
+
+_RULES = [
+    (re.compile(r"qu(?=[ei])"), "k"),
+    (re.compile(r"gu(?=[ei])"), "G"),  # g suave: no debe pasar a "j"
+    (re.compile(r"c(?=[ei])"), "s"),
+    (re.compile(r"g(?=[ei])"), "j"),
+    (re.compile(r"ch"), "X"),        # se conserva como sonido propio
+    (re.compile(r"ll"), "y"),
+    (re.compile(r"y(?![aeiou])"), "i"),
+    (re.compile(r"h"), ""),
+    (re.compile(r"[cq]"), "k"),
+    (re.compile(r"z"), "s"),
+    (re.compile(r"x"), "ks"),
+    (re.compile(r"v"), "b"),
+    (re.compile(r"w"), "u"),
+    (re.compile(r"(.)\1+"), r"\1"),  # rr -> r, ss -> s
+]
+
+@lru_cache(maxsize=8192)
+def phonetic_key(token: str) -> str:
+    key = token
+    for pattern, repl in _RULES:
+        key = pattern.sub(repl, key)
+    # Plural/singular comparten clave (los tokens ya vienen singularizados)
+    if len(key) > 3 and key.endswith("s"):
+        key = key[:-1]
+    return key
+
+def build_phonetic_index(entries: Iterable[Iterable[str]]) -> Dict[str, Set[int]]:
+    """Índice clave fonética -> posiciones de las entradas que la contienen."""
+    index: Dict[str, Set[int]] = {}
+    for pos, tokens in enumerate(entries):
+        for t in tokens:
+            index.setdefault(phonetic_key(t), set()).add(pos)
+    return index
+
+def phonetic_lookup(index: Dict[str, Set[int]], tokens: List[str]) -> Tuple[Set[int], List[str]]:
+    """Posiciones encontradas y tokens cuya clave no está en el índice."""
+    hits: Set[int] = set()
+    sin_clave: List[str] = []
+    for t in tokens:
+        found = index.get(phonetic_key(t))
+        if found:
+            hits |= found
+        else:
+            sin_clave.append(t)
+    return hits, sin_clave